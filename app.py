@@ -1,12 +1,31 @@
 import streamlit as st
+from model_pool import ModelPool
 import cv2
 import numpy as np
 import os
+import io
+import csv
+import json
+import time
+import threading
 from datetime import datetime
-from ultralytics import YOLO
-from image_enhancement import enhance_image
+from image_enhancement import enhance_image, get_pipeline, parse_steps
 from detection import video_detection
 from counting import video_counting
+from preview import PreviewPolicy, LivePreview
+from stride import StridePolicy
+from detections import Detections
+from result_cache import ResultCache, CACHE_MIN_CONF, make_key
+from model_backends import BACKENDS, resolve_weights
+from ingest import decode_image_upload, stream_video_upload, upload_digest, cleanup_inputs
+from zones import DEFAULT_ZONE_CONFIG, load_zone_config
+from profiling import Profiler
+from multistream import MultiStreamCounter
+from tiling import load_tiling_config, tiled_predict
+from export import open_sink
+from video_writer import AsyncVideoWriter, EncodePolicy, available_codecs
+from bulk_images import BulkDetector, count_uploads, iter_uploads
+from jobs import JobManager, JobStore, job_outputs, ACTIVE_STATES, RESUMABLE_STATES
 
 # =============== 1. PAGE CONFIGURATION ===============
 st.set_page_config(
@@ -42,73 +61,326 @@ st.markdown("""
 # =============== 3. HELPER FUNCTIONS ===============
 
 @st.cache_resource
-def load_model(model_path):
-    """Memuat model ke cache agar tidak reload terus menerus."""
-    return YOLO(model_path)
-
-def save_uploaded_file(uploaded_file, folder="inputs"):
-    """Menyimpan file upload ke folder sementara."""
-    os.makedirs(folder, exist_ok=True)
-    file_path = os.path.join(folder, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    return file_path
+def get_model_pool():
+    """Pool model bersama (nano/small/medium) yang dimuat & di-warmup di latar belakang."""
+    return ModelPool(max_models=3)
+
+@st.cache_resource
+def get_job_manager():
+    """Satu antrian job latar belakang per server (2 worker, masing-masing satu model)."""
+    return JobManager("outputs/jobs", workers=2)
+
+@st.cache_resource
+def start_input_cleanup(interval_s=3600):
+    """Retensi input sementara di folder inputs/: sekali saat server start lalu tiap `interval_s` detik."""
+    def loop():
+        store = JobStore("outputs/jobs")
+        while True:
+            try:
+                cleanup_inputs("inputs", max_age_hours=24, max_bytes=20 * 1024 ** 3, keep=store.active_inputs())
+            except OSError:
+                pass  # dicoba lagi di putaran berikutnya
+            time.sleep(interval_s)
+    thread = threading.Thread(target=loop, name="input-cleanup", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def get_result_cache():
+    """Cache hasil deteksi di disk, dibagi antar sesi & rerun."""
+    return ResultCache("cache/results", max_bytes=512 * 1024 * 1024)
+
+def enhancement_chain_sidebar():
+    """Widget sidebar untuk chain enhancement berurutan beserta parameternya."""
+    methods = st.sidebar.multiselect(
+        "Image Enhancement (applied in selected order)",
+        ["HE", "CLAHE", "CS", "Brightness", "Gamma", "Unsharp", "Bilateral", "Saturation"]
+    )
+    widgets = {}
+    if any(m in ("CLAHE", "Brightness", "Gamma", "Saturation") for m in methods):
+        with st.sidebar.expander("🎛️ Enhancement parameters"):
+            params = {
+                "CLAHE": lambda: {"clip_limit": st.slider("CLAHE clip limit", 0.5, 8.0, 2.0, 0.5)},
+                "Brightness": lambda: {"alpha": st.slider("Contrast (alpha)", 0.5, 3.0, 1.2, 0.1),
+                                       "beta": st.slider("Brightness (beta)", -100, 100, 30, 5)},
+                "Gamma": lambda: {"gamma": st.slider("Gamma", 0.2, 3.0, 1.5, 0.1)},
+                "Saturation": lambda: {"scale": st.slider("Saturation scale", 0.5, 3.0, 1.3, 0.1)},
+            }
+            widgets = {m: params[m]() for m in methods if m in params}
+    steps = [(m, widgets.get(m, {})) for m in methods]
+    return steps
+
+def render_gallery(results, per_page=24, n_cols=6, key="gallery", paginate=True):
+    """Galeri thumbnail hasil bulk (per halaman) dengan jumlah objek per gambar."""
+    if not results:
+        return
+    page = 0
+    n_pages = (len(results) + per_page - 1) // per_page
+    if paginate and n_pages > 1:
+        order = st.radio("Sort", ("Upload order", "Most objects", "No detections first"), horizontal=True,
+                         key=f"{key}_sort")
+        if order == "Most objects":
+            results = sorted(results, key=lambda r: -r["count"])
+        elif order == "No detections first":
+            results = sorted(results, key=lambda r: (r["count"] > 0, r["index"]))
+        page = st.number_input(f"Page (of {n_pages})", 1, n_pages, 1, key=f"{key}_page") - 1
+    cols = st.columns(n_cols)
+    for i, r in enumerate(results[page * per_page:(page + 1) * per_page]):
+        with cols[i % n_cols]:
+            name = os.path.basename(r["name"])
+            if r["error"]:
+                st.caption(f"❌ {name}: {r['error']}")
+                continue
+            detail = ", ".join(f"{label} {n}" for label, n in sorted(r["classes"].items()))
+            st.image(r["thumb"], use_container_width=True)
+            st.caption(f"**{name}** · {r['count']} obj{' · cached' if r['cached'] else ''}"
+                       + (f"  \n{detail}" if detail else ""))
+            if r.get("write_error"):
+                st.caption(f"⚠️ Not saved: {r['write_error']}")
+
+def tiling_sidebar():
+    """Widget sidebar ROI & tiling; mengembalikan TilingPolicy atau None (frame utuh @640)."""
+    with st.sidebar.expander("🔲 ROI & tiling"):
+        enabled = st.checkbox("Restrict to ROIs / tile large frames", value=False,
+                              help="Run the model on regions of interest and overlapping 640 px tiles "
+                                   "so small, distant objects in 4K footage are not lost.")
+        if not enabled:
+            return None
+        rois = st.text_area("ROIs [[x1, y1, x2, y2], ...] (0..1)", "[[0, 0, 1, 1]]", height=80)
+        tile = st.checkbox("Split into overlapping 640 px tiles", value=True)
+        overlap = st.slider("Tile overlap", 0.0, 0.5, 0.2, 0.05, disabled=not tile)
+        full_view = st.checkbox("Also run each full ROI (large objects)", value=True, disabled=not tile)
+        try:
+            return load_tiling_config({"rois": json.loads(rois), "tile": tile, "overlap": overlap,
+                                       "full_view": full_view})
+        except (ValueError, TypeError) as e:
+            st.error(f"❌ {e} — using the full frame.")
+            return None
 
 # ============== 4. SIDEBAR SETTINGS ==============
 st.sidebar.markdown("""<h2><span class="material-icons">tune</span> Settings</h2>""", unsafe_allow_html=True)
 
 # Global Settings
 model_size = st.sidebar.selectbox("YOLOv11 Model Size", ["nano", "small", "medium"], index=0)
-mode = st.sidebar.radio("Mode", ("Image", "Video"))
+backend = st.sidebar.selectbox("Inference backend", BACKENDS, index=0,
+                               help="Exported models are created with `python setup_models.py --export onnx openvino`.")
+mode = st.sidebar.radio("Mode", ("Image", "Bulk Images", "Video"))
 
 # Variable Initialization
 enhance_type = "None"
 video_mode = "Detection"
+video_source = "Upload file"
+max_batch = 8
+max_latency = 0.5
 confidence = 0.25
 save_outputs = True
+use_cache = True
+batch_size = 1
+queue_size = 4
+preview_policy = PreviewPolicy()
+zone_config = None
+stride_policy = None
+tiling_policy = None
+export_format = "None"
+background_jobs = False
+encode_policy = EncodePolicy()
+record_trace = False
+metrics_panel = None
 
 # Mode Specific Settings
-if mode == "Image":
-    enhance_type = st.sidebar.selectbox(
-        "Image Enhancement",
-        ["None", "HE", "CLAHE", "CS", "Brightness", "Gamma", "Unsharp", "Bilateral", "Saturation"]
-    )
+if mode in ("Image", "Bulk Images"):
+    enhance_type = enhancement_chain_sidebar()
     confidence = st.sidebar.slider("Confidence threshold", 0.0, 1.0, 0.25, 0.05)
     save_outputs = st.sidebar.checkbox("💾 Save annotated outputs", value=True)
+    use_cache = st.sidebar.checkbox("🗄️ Reuse cached detections", value=True,
+                                    help="Skip inference when the same image, model and enhancement were seen before.")
+    tiling_policy = tiling_sidebar()
+    if mode == "Bulk Images":
+        batch_size = st.sidebar.slider("Images per predict", 1, 64, 16,
+                                       help="Images of the same / similar size are batched into one predict call.")
+        bulk_workers = st.sidebar.slider("Decode / enhance threads", 1, 16, min(8, os.cpu_count() or 4))
 
 elif mode == "Video":
-    video_mode = st.sidebar.selectbox("Video Mode", ["Detection", "Counting"])
-    enhance_type = "None"
+    video_source = st.sidebar.radio("Video source", ("Upload file", "Live streams"), horizontal=True)
+    if video_source == "Live streams":
+        video_mode = "Counting"  # Sumber live selalu memakai tracking + counting per stream
+        st.sidebar.caption("Live streams run vehicle counting with one tracker per stream.")
+    else:
+        video_mode = st.sidebar.selectbox("Video Mode", ["Detection", "Counting"])
+    enhance_type = enhancement_chain_sidebar()
+    if video_mode == "Detection":
+        batch_size = st.sidebar.slider("Batch size (frames / predict)", 1, 32, 8)
+    if video_source == "Live streams":
+        max_batch = st.sidebar.slider("Max batch across streams", 1, 32, 8)
+        max_latency = st.sidebar.slider("Drop frames older than (s)", 0.1, 5.0, 0.5, 0.1)
+    if video_mode == "Counting":
+        with st.sidebar.expander("📐 Counting lines & zones"):
+            st.caption("Coordinates are 0..1 of the frame size when `normalized` is true.")
+            zone_file = st.file_uploader("Zone config (JSON)", type=["json"])
+            zone_text = zone_file.getvalue().decode("utf-8") if zone_file else st.text_area(
+                "Lines / zones", json.dumps(DEFAULT_ZONE_CONFIG, indent=2), height=220)
+            try:
+                load_zone_config(zone_text)
+                zone_config = zone_text
+            except (ValueError, TypeError, AttributeError) as e:
+                st.error(f"❌ {e} — using the default center line.")
+    if video_source == "Upload file":
+        queue_size = st.sidebar.slider("Pipeline queue depth", 1, 32, 4)
+
+        with st.sidebar.expander("⏭️ Inference stride"):
+            stride = st.slider("Run model every k-th frame", 1, 10, 1,
+                               help="Frames in between reuse / extrapolate the last detections.")
+            adaptive_stride = st.checkbox("Adaptive stride", value=False, disabled=stride == 1,
+                                          help="Lower the stride automatically when motion or detections rise.")
+        stride_policy = StridePolicy(stride, adaptive=adaptive_stride)
+        tiling_policy = tiling_sidebar()
+        export_format = st.sidebar.selectbox("🧾 Export records", ["None", "JSONL", "CSV"],
+                                             help="Per-frame boxes, track IDs and line/zone events, "
+                                                  "streamed to disk while the video is processed.")
+        background_jobs = st.sidebar.checkbox("🗂️ Run as background job", value=True,
+                                              help="Process on a local worker pool; the page stays responsive "
+                                                   "and changing widgets does not restart the video.")
+
+    with st.sidebar.expander("🖥️ Live preview"):
+        preview_on = st.checkbox("Show live preview", value=True)
+        preview_fps = st.slider("Preview FPS", 1, 30, 5, disabled=not preview_on)
+        preview_width = st.select_slider("Preview width (px)", [320, 480, 640, 960, 1280], value=640,
+                                         disabled=not preview_on)
+    preview_policy = PreviewPolicy(enabled=preview_on, max_fps=preview_fps, max_width=preview_width)
+
+    with st.sidebar.expander("📊 Stage metrics", expanded=True):
+        record_trace = st.checkbox("Save trace file", value=False,
+                                   help="Chrome trace JSON of every stage span (open in ui.perfetto.dev).")
+        metrics_panel = st.empty()
+        metrics_panel.caption("Rolling per-stage timings appear here while a video is processing.")
     save_outputs = st.sidebar.checkbox("💾 Save annotated outputs", value=True)
+    if save_outputs:
+        with st.sidebar.expander("🎞️ Output encoding"):
+            codec = st.selectbox("Codec", available_codecs(),
+                                 help="ffmpeg encoders (H.264, browser-playable) are listed when ffmpeg is installed; "
+                                      "mp4v is the built-in OpenCV fallback.")
+            out_width = st.select_slider("Max output width (px)", ["Source", 1920, 1280, 960, 640], value="Source")
+            out_every = st.slider("Write every k-th frame", 1, 10, 1)
+        encode_policy = EncodePolicy(codec, None if out_width == "Source" else out_width, out_every)
     confidence = st.sidebar.slider("Confidence threshold", 0.0, 1.0, 0.25, 0.05)
 
-# Upload File
-uploaded_file = st.file_uploader(
-    f"📤 Upload {'Image' if mode == 'Image' else 'Video'}",
-    type=["jpg", "jpeg", "png", "bmp"] if mode == "Image" else ["mp4", "mov", "avi", "mkv"]
-)
+# Label chain untuk nama folder / file output (mis. "CLAHE-Gamma")
+enhance_pipeline = get_pipeline(enhance_type)
+enhance_label = enhance_pipeline.name if enhance_pipeline else "None"
+
+# Upload File (atau daftar sumber live)
+uploaded_file = None
+stream_sources = []
+if mode == "Video" and video_source == "Live streams":
+    sources_text = st.text_area("📡 Stream sources (one per line: rtsp://… URL, webcam index, or video file path)",
+                                "0", height=120)
+    stream_sources = [line.strip() for line in sources_text.splitlines() if line.strip()]
+    stream_duration = st.number_input("Run for (seconds, 0 = until stopped)", 0, 24 * 3600, 60, step=30)
+else:
+    uploaded_file = st.file_uploader(
+        "📤 Upload images or .zip archives", type=["jpg", "jpeg", "png", "bmp", "zip"], accept_multiple_files=True
+    ) if mode == "Bulk Images" else st.file_uploader(
+        f"📤 Upload {'Image' if mode == 'Image' else 'Video'}",
+        type=["jpg", "jpeg", "png", "bmp"] if mode == "Image" else ["mp4", "mov", "avi", "mkv"]
+    )
 
 # Model Loading Section
 st.sidebar.markdown("---")
 st.sidebar.subheader("📦 Model Status")
-MODEL_PATH = f"weights/best_{model_size}.pt"
+MODEL_PATH, backend_used = resolve_weights(model_size, backend)
+if backend_used != backend:
+    st.sidebar.warning(f"⚠️ No {backend} export for {model_size}, falling back to PyTorch weights.")
+
+start_input_cleanup()
 
 model = None
-try:
-    if os.path.exists(MODEL_PATH):
-        model = load_model(MODEL_PATH)
-        st.sidebar.success(f"✅ Model loaded: **{model_size.upper()}**")
+model_pool = get_model_pool()
+model_status = st.sidebar.empty()
+if os.path.exists(MODEL_PATH):
+    # Model terpilih dimuat lebih dulu, ukuran lain menyusul agar ganti ukuran tidak cold start
+    model_pool.preload([MODEL_PATH] + [resolve_weights(size, backend)[0]
+                                       for size in ("nano", "small", "medium") if size != model_size])
+    if model_pool.is_ready(MODEL_PATH):
+        model_status.success(f"✅ Model loaded: **{model_size.upper()}** ({backend_used})")
     else:
-        st.sidebar.error(f"❌ Weights not found: {MODEL_PATH}")
-        st.sidebar.info("Please place your .pt files in the 'weights/' folder.")
-except Exception as e:
-    st.sidebar.error("❌ Failed to load model")
-    st.sidebar.warning(str(e))
+        model_status.info(f"⏳ Warming up **{model_size.upper()}** in the background…")
+else:
+    model_status.error(f"❌ Weights not found: {MODEL_PATH}")
+    st.sidebar.info("Please place your .pt files in the 'weights/' folder.")
+
+# Model baru diambil dari pool saat benar-benar dipakai (job latar belakang memuat model di worker)
+needs_model = bool(stream_sources) or (bool(uploaded_file) and not (mode == "Video" and background_jobs))
+if needs_model and os.path.exists(MODEL_PATH):
+    try:
+        with st.spinner(f"Loading {model_size} model…"):
+            model = model_pool.get(MODEL_PATH)
+        model_status.success(f"✅ Model loaded: **{model_size.upper()}** ({backend_used})")
+    except Exception as e:
+        model_status.error("❌ Failed to load model")
+        st.sidebar.warning(str(e))
+
+with st.sidebar.expander("⏱️ Model pool"):
+    pool_stats = model_pool.stats()
+    if pool_stats["first_result_s"] is not None:
+        st.caption(f"Time to first result: **{pool_stats['first_result_s']:.1f}s** since startup")
+    st.table({
+        os.path.basename(path): {"load s": round(m["load_s"], 2), "warmup s": round(m["warmup_s"], 2),
+                                 "ready after s": round(m["ready_s"], 1), "MB": round(m["bytes"] / 1024 ** 2, 1)}
+        for path, m in pool_stats["models"].items()
+    } or {"—": {"status": "loading" if pool_stats["loading"] else "empty"}})
 
 # =============== 5. MAIN LOGIC ===============
 st.markdown("<div class='main-section'>", unsafe_allow_html=True)
 
-if uploaded_file is None:
+if stream_sources:
+    # --- LIVE STREAM MODE ---
+    if model is None:
+        st.error("⚠️ Model belum dimuat. Periksa folder weights Anda.")
+    elif st.button("▶️ Start streams"):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        live_output_dir = os.path.join("outputs", "videos", model_size, "Live", timestamp) if save_outputs else None
+        names = [f"cam{i + 1}" for i in range(len(stream_sources))]
+
+        # Grid preview per stream (di-throttle sesuai PreviewPolicy)
+        cols = st.columns(min(len(names), 3))
+        previews = {}
+        profiler = Profiler(trace=record_trace)
+        for i, name in enumerate(names):
+            with cols[i % len(cols)]:
+                st.caption(f"**{name}** · `{stream_sources[i]}`")
+                previews[name] = LivePreview(st.empty(), None, 0, preview_policy,
+                                             profiler=profiler if i == 0 else None,
+                                             metrics=metrics_panel if i == 0 else None)
+        st.info(f"Streaming {len(names)} source(s) — press Stop (top right) to end early.")
+
+        runner = MultiStreamCounter(
+            dict(zip(names, stream_sources)), model, enhance_image, enhance_type, confidence,
+            zone_config=zone_config, max_batch=max_batch, max_latency=max_latency,
+            output_dir=live_output_dir, profiler=profiler, encode=encode_policy
+        )
+        try:
+            stats = runner.run(on_frame=lambda name, frame: previews[name].update(0, frame),
+                               duration=stream_duration or None)
+            st.table({
+                name: {"processed": s["processed"], "dropped": s["dropped"], "FPS": round(s["fps"], 1),
+                       "latency p50 ms": round(s["latency_p50_ms"], 1), "reconnects": s["reconnects"]}
+                for name, s in stats["streams"].items()
+            })
+            st.table({name: {label: f"{c['in']} / {c['out']}" for label, c in s["counts"].items()}
+                      for name, s in stats["streams"].items()})
+            for name, s in stats["streams"].items():
+                if s["error"]:
+                    st.warning(f"{name}: {s['error']}")
+            if live_output_dir:
+                st.success(f"Annotated streams saved to `{live_output_dir}`")
+            if record_trace:
+                trace_path = profiler.export_trace(os.path.join("outputs", "videos", model_size, "Live",
+                                                                f"trace_{timestamp}.json"))
+                st.caption(f"Stage trace saved to `{trace_path}`")
+        except Exception as e:
+            st.error(f"An error occurred during stream processing: {e}")
+
+elif not uploaded_file:
     # Tampilan Awal Kosong
     st.markdown("""
     <div class='empty-upload'>
@@ -117,7 +389,7 @@ if uploaded_file is None:
     </div>
     """, unsafe_allow_html=True)
 
-elif model is None:
+elif not os.path.exists(MODEL_PATH) or (model is None and needs_model):
     st.error("⚠️ Model belum dimuat. Periksa folder weights Anda.")
 
 else:
@@ -125,9 +397,9 @@ else:
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     # Menentukan folder output
-    if mode == "Image":
+    if mode in ("Image", "Bulk Images"):
         folder_category = "images"
-        sub_category = enhance_type
+        sub_category = enhance_label
     else:
         folder_category = "videos"
         sub_category = video_mode.capitalize() # Detection / Counting
@@ -135,25 +407,43 @@ else:
     #/outputs/videos/model/counting/detecton
     base_output_dir = os.path.join("outputs", folder_category, model_size, sub_category)
     os.makedirs(base_output_dir, exist_ok=True)
-
-    input_dir = os.path.join("inputs", "images" if mode == "Image" else "videos")
-    os.makedirs(input_dir, exist_ok=True)
     
     # --- IMAGE MODE ---
     if mode == "Image":
-        # Simpan input sementara
-        input_path = save_uploaded_file(uploaded_file, folder="inputs/images")
-        
-        # Baca & Proses Image
-        img = cv2.imread(input_path)
+        # Decode langsung dari buffer upload (tanpa round-trip ke disk)
+        img = decode_image_upload(uploaded_file)
+        if img is None:
+            st.error("❌ Cannot decode uploaded image.")
+            st.stop()
         img_proc = enhance_image(img, enhance_type)
 
-        with st.spinner("🧠 Running YOLOv11 detection..."):
-            results = model.predict(source=img_proc, conf=confidence, imgsz=640, verbose=False)
-        
-        res = results[0]
-        annotated = res.plot() if hasattr(res, "plot") else img_proc.copy()
-        count = len(res.boxes) if hasattr(res, "boxes") else 0
+        # Cache hasil: kunci = hash konten input + weights + enhancement + parameter inferensi
+        dets = None
+        if use_cache:
+            result_cache = get_result_cache()
+            input_digest = upload_digest(uploaded_file)
+            tiling_key = {"tiling": repr(tiling_policy)} if tiling_policy is not None else {}
+            cache_key = make_key(input_digest, MODEL_PATH, parse_steps(enhance_type), imgsz=640, **tiling_key)
+            dets = result_cache.get(cache_key, confidence)
+        cached = dets is not None
+
+        if not cached:
+            # Inferensi dengan threshold rendah agar perubahan confidence cukup memfilter ulang hasil cache
+            min_conf = min(confidence, CACHE_MIN_CONF)
+            with st.spinner("🧠 Running YOLOv11 detection..."):
+                if tiling_policy is not None:
+                    raw = tiled_predict(model, [img_proc], tiling_policy, min_conf)[0]
+                else:
+                    results = model.predict(source=img_proc, conf=min_conf, imgsz=640, verbose=False)
+                    raw = Detections.from_result(results[0])
+            if use_cache:
+                result_cache.put(cache_key, raw, min_conf)
+            dets = raw.filter(confidence)
+
+        annotated = dets.plot(img_proc)
+        if tiling_policy is not None:
+            tiling_policy.draw(annotated)
+        count = len(dets)
 
         # Menampilkan Hasil
         col1, col2 = st.columns(2)
@@ -161,8 +451,9 @@ else:
             st.caption("Original / Enhanced Input")
             st.image(cv2.cvtColor(img_proc, cv2.COLOR_BGR2RGB), use_container_width=True)
         with col2:
-            st.caption(f"Result (Objects: {count})")
+            st.caption(f"Result (Objects: {count}){' · cached' if cached else ''}")
             st.image(cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB), use_container_width=True)
+        model_pool.mark_first_result()
 
         # Kartu Statistik
         st.markdown(f"""
@@ -177,14 +468,116 @@ else:
 
         # Simpan Output
         if save_outputs:
-            out_name = os.path.join(base_output_dir, f"det_{enhance_type}_{timestamp}.jpg")
+            out_name = os.path.join(base_output_dir, f"det_{enhance_label}_{timestamp}.jpg")
             cv2.imwrite(out_name, annotated)
             st.success(f"Saved to: `{out_name}`")
 
+    # --- BULK IMAGE MODE ---
+    elif mode == "Bulk Images":
+        n_images = count_uploads(uploaded_file)
+        # Hasil disimpan di session agar pindah halaman / sortir galeri tidak menjalankan ulang deteksi
+        signature = (tuple((f.name, getattr(f, "size", None)) for f in uploaded_file), MODEL_PATH,
+                     repr(parse_steps(enhance_type)), confidence, repr(tiling_policy))
+        saved = st.session_state.get("bulk_results")
+        if saved is not None and saved["signature"] != signature:
+            saved = None
+
+        if st.button(f"▶️ Detect {n_images} image(s)"):
+            detector = BulkDetector(
+                model, enhance_image, enhance_type, confidence, batch_size=batch_size, workers=bulk_workers,
+                output_dir=base_output_dir if save_outputs else None, label=enhance_label, timestamp=timestamp,
+                tiling=tiling_policy, cache=get_result_cache() if use_cache else None, model_path=MODEL_PATH
+            )
+            progress_bar = st.progress(0.0)
+            live_gallery = st.empty()
+            results = []
+            last_render = 0.0
+            with st.spinner("🧠 Running YOLOv11 detection..."):
+                for r in detector.run(iter_uploads(uploaded_file)):
+                    results.append(r)
+                    if len(results) == 1:
+                        model_pool.mark_first_result()
+                    now = time.perf_counter()
+                    # Galeri halaman pertama diperbarui selagi berjalan (di-throttle 1x per detik)
+                    if now - last_render >= 1.0:
+                        progress_bar.progress(min(len(results) / max(n_images, 1), 1.0))
+                        with live_gallery.container():
+                            render_gallery(sorted(results, key=lambda x: x["index"]), key="bulk_live",
+                                           paginate=False)
+                        last_render = now
+            live_gallery.empty()
+            progress_bar.progress(1.0)
+            saved = {"signature": signature, "results": sorted(results, key=lambda x: x["index"]),
+                     "stats": detector.stats(), "output_dir": base_output_dir if save_outputs else None}
+            st.session_state["bulk_results"] = saved
+
+        if saved is not None:
+            results, stats = saved["results"], saved["stats"]
+            totals = {}
+            for r in results:
+                for label, n in r["classes"].items():
+                    totals[label] = totals.get(label, 0) + n
+            stage_ms = {name: round(p["avg_ms"], 2) for name, p in stats["profile"].items()}
+            st.markdown(f"""
+            <div class='result-card'>
+                <div class='result-header'>
+                    <span class="material-icons result-icon">collections</span>
+                    <h2>Bulk Detection Result</h2>
+                </div>
+                <p><strong>Images:</strong> {stats['images']} · <strong>Detected objects:</strong>
+                {sum(r['count'] for r in results)} · <strong>Predict batches:</strong> {stats['batches']}
+                (avg {stats['avg_batch']:.1f} images) · <strong>Cached:</strong> {stats['cached']}
+                · <strong>Failed:</strong> {stats['failed']}
+                · <strong>Not saved:</strong> {stats.get('write_failed', 0)}</p>
+            </div>
+            """, unsafe_allow_html=True)
+            if totals:
+                st.table({"objects": totals})
+            st.caption("ms / image: " + ", ".join(f"{name} {ms}" for name, ms in stage_ms.items()))
+
+            labels = sorted(totals)
+            table = io.StringIO()
+            csv_writer = csv.writer(table)
+            csv_writer.writerow(["name", "count", *labels, "output", "error"])
+            for r in results:
+                csv_writer.writerow([r["name"], r["count"], *(r["classes"].get(label, 0) for label in labels),
+                                     r["output"] or "", r["error"] or r.get("write_error") or ""])
+            st.download_button("⬇️ Download per-image counts (CSV)", table.getvalue(),
+                               file_name=f"bulk_counts_{timestamp}.csv", mime="text/csv")
+            if saved["output_dir"]:
+                st.success(f"Annotated images saved to `{saved['output_dir']}`")
+            render_gallery(results, key="bulk")
+
+    # --- VIDEO MODE (JOB LATAR BELAKANG) ---
+    elif mode == "Video" and background_jobs:
+        if st.button("▶️ Submit job"):
+            # Upload baru disalin + di-hash saat submit, bukan di setiap rerun widget
+            input_path, _ = stream_video_upload(uploaded_file, folder="inputs/videos")
+            job_id = get_job_manager().submit(input_path, MODEL_PATH, {
+                "model_size": model_size,
+                "enhance": enhance_type,
+                "enhance_label": enhance_label,
+                "video_mode": video_mode,
+                "confidence": confidence,
+                "batch_size": batch_size,
+                "queue_size": queue_size,
+                "output_dir": "outputs",
+                "zones": zone_config,
+                "stride": stride,
+                "adaptive_stride": adaptive_stride,
+                "trace": record_trace,
+                "tiling": tiling_policy.to_config() if tiling_policy is not None else None,
+                "export": export_format.lower() if export_format != "None" else None,
+                "encode": {"codec": encode_policy.codec, "max_width": encode_policy.max_width,
+                           "every": encode_policy.every},
+            })
+            st.session_state["last_job"] = job_id
+            st.success(f"Job `{job_id}` queued — progress is listed below.")
+
     # --- VIDEO MODE ---
     elif mode == "Video":
-        # Simpan input sementara
-        input_path = save_uploaded_file(uploaded_file, folder="inputs/videos")
+        # Tulis video ke disk per chunk dengan nama unik berbasis hash konten
+        input_path, _ = stream_video_upload(uploaded_file, folder="inputs/videos")
         
         cap = cv2.VideoCapture(input_path)
         
@@ -198,34 +591,81 @@ else:
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
 
             # Setup Writer
+            profiler = Profiler(trace=record_trace)
             writer = None
             out_video_path = None
             if save_outputs:
                 out_video_path = os.path.join(base_output_dir, f"output_{timestamp}.mp4")
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                writer = cv2.VideoWriter(out_video_path, fourcc, fps, (width, height))
+                writer = AsyncVideoWriter(out_video_path, fps, (width, height), encode_policy, profiler=profiler)
 
             # UI Placeholder
             stframe = st.empty()
             progress_bar = st.progress(0)
             
             st.info(f"Processing Video: {width}x{height} @ {fps:.1f} FPS")
+            sink = None
+            if export_format != "None":
+                sink = open_sink(os.path.join(base_output_dir, f"records_{timestamp}.{export_format.lower()}"))
 
             try:
                 # Panggil Fungsi Eksternal sesuai Mode
+                stats = None
                 if video_mode == "Detection":
-                    video_detection(
+                    stats = video_detection(
                         cap, model, enhance_image, enhance_type, confidence,
-                        writer, stframe, progress_bar, total_frames
+                        writer, stframe, progress_bar, total_frames,
+                        batch_size=batch_size, queue_size=queue_size, preview=preview_policy,
+                        stride=stride_policy, profiler=profiler, metrics=metrics_panel, tiling=tiling_policy,
+                        export=sink
                     )
                 elif video_mode == "Counting":
-                    video_counting(
+                    stats = video_counting(
                         cap, model, enhance_image, enhance_type, confidence,
-                        writer, stframe, progress_bar, total_frames
+                        writer, stframe, progress_bar, total_frames,
+                        queue_size=queue_size, preview=preview_policy, zone_config=zone_config,
+                        stride=stride_policy, profiler=profiler, metrics=metrics_panel, tiling=tiling_policy,
+                        export=sink
                     )
+
+                if stats:
+                    model_pool.mark_first_result()
+                    st.info(f"⚡ {stats['frames']} frames in {stats['seconds']:.1f}s → {stats['fps']:.1f} FPS "
+                            f"({stats['keyframes']} inferred)")
+                    if stats.get("bottleneck"):
+                        st.caption(f"🐢 Slowest stage: **{stats['bottleneck']}**")
+                    if stats.get("zones"):
+                        st.table(stats["zones"])
+                    if stats.get("lines") and len(stats["lines"]) > 1:
+                        st.table(stats["lines"])
+                    with st.expander("⏱️ Pipeline stage timings"):
+                        st.table({
+                            name: {"frames": t["items"], "avg ms/frame": round(t["avg_ms"], 2)}
+                            for name, t in stats["stages"].items()
+                        })
+                        st.table({
+                            name: {"max depth": q["max"], "avg depth": round(q["avg"], 2)}
+                            for name, q in stats["queues"].items()
+                        })
+
+                    if record_trace:
+                        trace_path = profiler.export_trace(os.path.join(base_output_dir, f"trace_{timestamp}.json"))
+                        with open(trace_path, "rb") as f:
+                            st.download_button("⬇️ Download stage trace", f, file_name=os.path.basename(trace_path),
+                                               mime="application/json")
+
+                    if stats.get("export"):
+                        with open(stats["export"], "rb") as f:
+                            st.download_button("⬇️ Download records", f, file_name=os.path.basename(stats["export"]),
+                                               mime="text/csv" if export_format == "CSV" else "application/x-ndjson")
                 
                 if save_outputs and out_video_path:
+                    writer.release()  # tunggu buffer encoder selesai sebelum file dipakai
+                    enc = writer.stats()
                     st.success(f"Video processing complete! Saved to `{out_video_path}`")
+                    st.caption(f"🎞️ {enc['backend']} · {enc['size'][0]}x{enc['size'][1]} @ {enc['fps']:.1f} FPS · "
+                               f"{enc['frames_written']} frames · {enc['encode_ms']:.1f} ms/frame encode")
+                    if enc["backend"].startswith("ffmpeg"):
+                        st.video(out_video_path)
                     
             except Exception as e:
                 st.error(f"An error occurred during video processing: {e}")
@@ -233,5 +673,51 @@ else:
                 cap.release()
                 if writer:
                     writer.release()
+                if sink:
+                    sink.close()
+
+def jobs_panel():
+    """Daftar job latar belakang (polling state dari disk) dengan tombol cancel / resume & unduhan output."""
+    manager = get_job_manager()
+    jobs = manager.list()[:10]
+    if not jobs:
+        st.caption("No background jobs yet.")
+        return
+    for job in jobs:
+        opts = job["options"]
+        status = job["status"]
+        with st.container(border=True):
+            head, action = st.columns([4, 1])
+            head.markdown(f"**`{job['id']}`** · {opts['video_mode']} · {opts['model_size']} · "
+                          f"`{os.path.basename(job['input'])}` — **{status}**")
+            if status in ACTIVE_STATES:
+                st.progress(min(float(job.get("progress") or 0.0), 1.0))
+                if action.button("⏹️ Cancel", key=f"cancel_{job['id']}"):
+                    manager.cancel(job["id"])
+            elif status in RESUMABLE_STATES:
+                if job.get("error"):
+                    st.caption(f"❌ {job['error']}")
+                if action.button("🔁 Resume", key=f"resume_{job['id']}"):
+                    try:
+                        manager.resume(job["id"])
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+            elif status == "done":
+                result = job["result"]
+                st.caption(f"⚡ {result['frames']} frames in {job.get('elapsed', 0):.1f}s → {result['fps']:.1f} FPS "
+                           f"· slowest stage: {result.get('bottleneck')}")
+                for key, path in job_outputs(job).items():
+                    with open(path, "rb") as f:
+                        st.download_button(f"⬇️ {key}: {os.path.basename(path)}", f,
+                                           file_name=os.path.basename(path), key=f"dl_{key}_{job['id']}")
+
+if mode == "Video" and video_source == "Upload file" and background_jobs:
+    st.markdown("### 🗂️ Background jobs")
+    # Polling berkala tanpa rerun seluruh halaman (fragment) bila tersedia
+    if hasattr(st, "fragment"):
+        st.fragment(run_every=2)(jobs_panel)()
+    else:
+        jobs_panel()
+        st.button("🔄 Refresh jobs")
 
 st.markdown("</div>", unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""
+Headless batch runner for folders of images and videos.
+Reuses enhance_image, video_detection and video_counting without any Streamlit objects
+and writes results to the same outputs/<images|videos>/<size>/<mode> layout as the app.
+
+Example:
+    python batch_runner.py "data/site_a/*.mp4" data/stills --model-size small --video-mode Counting --workers 4
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from image_enhancement import get_pipeline
+from model_backends import resolve_weights
+from tiling import load_tiling_config, tiled_predict
+from video_writer import CODECS
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv"}
+
+# Model per worker process (diisi oleh _init_worker / load_worker_model)
+_MODEL = None
+_MODEL_PATH = None
+
+def collect_inputs(patterns):
+    """Expand directories / glob patterns into a sorted list of supported image & video files."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        for path in candidates:
+            ext = os.path.splitext(path)[1].lower()
+            if os.path.isfile(path) and ext in IMAGE_EXTS | VIDEO_EXTS:
+                files.add(os.path.abspath(path))
+    return sorted(files)
+
+def output_stems(inputs):
+    """
+    Output name stem per input: the file stem, or its path relative to the common folder when
+    several inputs share a stem (a/cam1.mp4, b/cam1.mp4 -> a_cam1, b_cam1), so outputs never collide.
+    """
+    stems = {path: os.path.splitext(os.path.basename(path))[0] for path in inputs}
+    counts = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    root = os.path.commonpath(inputs) if len(inputs) > 1 else ""
+    used, out = set(), {}
+    for path in sorted(inputs):
+        stem = stems[path]
+        if counts[stem] > 1:
+            stem = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, "_")
+        candidate, k = stem, 1
+        while candidate in used:
+            k += 1
+            candidate = f"{stem}_{k}"
+        used.add(candidate)
+        out[path] = candidate
+    return out
+
+def _init_worker(model_path):
+    """Load one YOLO model per worker process."""
+    global _MODEL, _MODEL_PATH
+    from model_pool import load_yolo
+    _MODEL = load_yolo(model_path)
+    _MODEL_PATH = model_path
+
+def load_worker_model(model_path):
+    """Keep a single model per worker, reloading only when a task asks for different weights."""
+    if _MODEL is None or _MODEL_PATH != model_path:
+        _init_worker(model_path)
+    return _MODEL
+
+def _process_image(path, opts, timestamp, stem=None):
+    import cv2
+    from image_enhancement import enhance_image
+
+    img = cv2.imread(path)
+    if img is None:
+        raise ValueError("cannot decode image")
+    img_proc = enhance_image(img, opts["enhance"])
+    label = opts["enhance_label"]
+
+    tiling = load_tiling_config(opts.get("tiling"))
+    if tiling is not None:
+        dets = tiled_predict(_MODEL, [img_proc], tiling, opts["confidence"])[0]
+        annotated = tiling.draw(dets.plot(img_proc))
+        count = len(dets)
+    else:
+        results = _MODEL.predict(source=img_proc, conf=opts["confidence"], imgsz=640, verbose=False)
+        res = results[0]
+        annotated = res.plot() if hasattr(res, "plot") else img_proc.copy()
+        count = len(res.boxes) if hasattr(res, "boxes") else 0
+
+    out_dir = os.path.join(opts["output_dir"], "images", opts["model_size"], label)
+    os.makedirs(out_dir, exist_ok=True)
+    stem = stem or os.path.splitext(os.path.basename(path))[0]
+    out_path = os.path.join(out_dir, f"det_{label}_{stem}_{timestamp}.jpg")
+    cv2.imwrite(out_path, annotated)
+    return {"type": "image", "output": out_path, "detections": count}
+
+def _process_video(path, opts, timestamp, progress=None, cancel_check=None, stem=None):
+    import cv2
+    from image_enhancement import enhance_image
+    from detection import video_detection
+    from counting import video_counting
+    from stride import StridePolicy
+    from profiling import Profiler
+    from export import open_sink
+    from video_writer import AsyncVideoWriter, EncodePolicy
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("cannot open video")
+
+    writer = None
+    sink = None
+    try:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+        mode = opts["video_mode"]
+        out_dir = os.path.join(opts["output_dir"], "videos", opts["model_size"], mode)
+        os.makedirs(out_dir, exist_ok=True)
+        stem = stem or os.path.splitext(os.path.basename(path))[0]
+        out_path = os.path.join(out_dir, f"output_{stem}_{timestamp}.mp4")
+        profiler = Profiler(trace=opts.get("trace", False))
+        writer = AsyncVideoWriter(out_path, fps, (width, height), EncodePolicy(**opts.get("encode", {})),
+                                  profiler=profiler)
+
+        stride = StridePolicy(opts.get("stride", 1), adaptive=opts.get("adaptive_stride", False))
+        tiling = load_tiling_config(opts.get("tiling"))
+        if opts.get("export"):
+            sink = open_sink(f"{os.path.splitext(out_path)[0]}.records.{opts['export']}")
+        if mode == "Detection":
+            stats = video_detection(
+                cap, _MODEL, enhance_image, opts["enhance"], opts["confidence"],
+                writer, progress=progress, total_frames=total_frames, batch_size=opts["batch_size"],
+                queue_size=opts.get("queue_size", 4), stride=stride,
+                profiler=profiler, tiling=tiling, export=sink, cancel_check=cancel_check
+            )
+        else:
+            stats = video_counting(
+                cap, _MODEL, enhance_image, opts["enhance"], opts["confidence"],
+                writer, progress=progress, total_frames=total_frames, queue_size=opts.get("queue_size", 4),
+                zone_config=opts.get("zones"), stride=stride,
+                profiler=profiler, tiling=tiling, export=sink, cancel_check=cancel_check
+            )
+    finally:
+        cap.release()
+        if writer:
+            writer.release()
+        if sink:
+            sink.close()
+
+    record = {"type": "video", "output": out_path, "frames": stats["frames"],
+              "keyframes": stats["keyframes"], "seconds": round(stats["seconds"], 3),
+              "fps": round(stats["fps"], 2), "bottleneck": stats["bottleneck"],
+              "stage_ms": {name: round(s["avg_ms"], 3) for name, s in stats["profile"].items()},
+              "encoder": writer.stats()}
+    if opts.get("trace"):
+        record["trace"] = profiler.export_trace(f"{os.path.splitext(out_path)[0]}.trace.json")
+    for key in ("counts", "lines", "zones", "export"):
+        if key in stats:
+            record[key] = stats[key]
+    return record
+
+def process_file(path, opts, timestamp, stem=None):
+    """Process a single input file inside a worker; never raises, errors go into the record."""
+    t0 = time.perf_counter()
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in IMAGE_EXTS:
+            record = _process_image(path, opts, timestamp, stem)
+        else:
+            record = _process_video(path, opts, timestamp, stem=stem)
+        record["status"] = "ok"
+    except Exception as e:
+        record = {"type": "image" if ext in IMAGE_EXTS else "video", "status": "error", "error": str(e)}
+    record["input"] = path
+    record["elapsed"] = round(time.perf_counter() - t0, 3)
+    return record
+
+def run_batch(inputs, model_path, opts, workers=1):
+    """Spread inputs across a process pool (one model per worker) and return per-file records."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    records = []
+    stems = output_stems(inputs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = {pool.submit(process_file, path, opts, timestamp, stems[path]): path for path in inputs}
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            status = "✓" if record["status"] == "ok" else "✗"
+            print(f"{status} {os.path.basename(record['input'])} ({record['elapsed']:.1f}s)")
+    records.sort(key=lambda r: r["input"])
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description="Run YOLOv11 enhancement/detection/counting headlessly.")
+    parser.add_argument("inputs", nargs="+", help="Input directories or glob patterns")
+    parser.add_argument("--model-size", choices=["nano", "small", "medium"], default="nano")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch",
+                        help="Exported backend to use when available (falls back to .pt)")
+    parser.add_argument("--weights", help="Override weights path (default: weights/best_<size>.pt)")
+    parser.add_argument("--enhance", default="None",
+                        help='Enhancement method or chain, e.g. "CLAHE" or "CLAHE>Gamma>Saturation"')
+    parser.add_argument("--video-mode", choices=["Detection", "Counting"], default="Detection")
+    parser.add_argument("--zones", help="Counting lines/zones JSON file (video counting)")
+    parser.add_argument("--tiling", help='ROI / tiling JSON file or string, e.g. \'{"rois": [[0, 0.4, 1, 1]]}\'')
+    parser.add_argument("--conf", type=float, default=0.25, help="Confidence threshold")
+    parser.add_argument("--batch-size", type=int, default=8, help="Frames per predict call (video detection)")
+    parser.add_argument("--stride", type=int, default=1, help="Run the model every k-th frame (video)")
+    parser.add_argument("--adaptive-stride", action="store_true", help="Lower the stride when motion rises")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--output-dir", default="outputs")
+    parser.add_argument("--trace", action="store_true", help="Write a per-stage Chrome trace next to each output video")
+    parser.add_argument("--codec", choices=list(CODECS), default="auto",
+                        help="Output video codec; ffmpeg encoders are used when available, otherwise mp4v")
+    parser.add_argument("--out-width", type=int, help="Downscale output videos to this width")
+    parser.add_argument("--out-every", type=int, default=1, help="Write only every k-th frame to output videos")
+    parser.add_argument("--export", choices=["jsonl", "csv"],
+                        help="Stream per-frame boxes and line/zone events next to each output video")
+    parser.add_argument("--summary", help="Summary JSON path (default: <output-dir>/summary_<timestamp>.json)")
+    args = parser.parse_args()
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        parser.error("no supported image/video files found")
+
+    try:
+        pipeline = get_pipeline(args.enhance)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        load_tiling_config(args.tiling)
+    except ValueError as e:
+        parser.error(str(e))
+
+    model_path = args.weights or resolve_weights(args.model_size, args.backend)[0]
+    if not os.path.exists(model_path):
+        parser.error(f"weights not found: {model_path}")
+
+    opts = {
+        "model_size": args.model_size,
+        "enhance": args.enhance,
+        "enhance_label": pipeline.name if pipeline else "None",
+        "video_mode": args.video_mode,
+        "confidence": args.conf,
+        "batch_size": args.batch_size,
+        "output_dir": args.output_dir,
+        "zones": args.zones,
+        "stride": args.stride,
+        "adaptive_stride": args.adaptive_stride,
+        "trace": args.trace,
+        "tiling": args.tiling,
+        "export": args.export,
+        "encode": {"codec": args.codec, "max_width": args.out_width, "every": args.out_every},
+    }
+
+    print(f"→ {len(inputs)} file(s), {args.workers} worker(s), model: {model_path}")
+    t0 = time.perf_counter()
+    records = run_batch(inputs, model_path, opts, workers=args.workers)
+
+    summary = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model": model_path,
+        "options": opts,
+        "elapsed": round(time.perf_counter() - t0, 3),
+        "ok": sum(r["status"] == "ok" for r in records),
+        "failed": sum(r["status"] != "ok" for r in records),
+        "files": records,
+    }
+    summary_path = args.summary or os.path.join(
+        args.output_dir, f"summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Summary written to: {summary_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Reproducible, offline benchmark suite for end-to-end and per-stage throughput.
+
+Runs on generated images/clips at several resolutions and covers:
+- every enhancement method (latency percentiles, FPS)
+- every model size x video mode (FPS, per-stage latency percentiles from the pipeline)
+- cold start per model size: import, load, warm-up and time-to-first-result in a fresh process
+Each case runs in a fresh worker process so peak RSS is reported per case.
+When weights/best_<size>.pt is missing the matching yolo11 architecture is built with
+random weights (no download), which keeps throughput numbers representative.
+
+Usage:
+    python benchmarks/run_benchmarks.py                                  # full suite
+    python benchmarks/run_benchmarks.py --resolutions 720p --sizes nano  # subset
+    python benchmarks/run_benchmarks.py --save-baseline                  # store baseline
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESOLUTIONS = {"480p": (480, 854), "720p": (720, 1280), "1080p": (1080, 1920)}
+MODEL_ARCH = {"nano": "yolo11n.yaml", "small": "yolo11s.yaml", "medium": "yolo11m.yaml"}
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# --- 1. DATA SINTETIS ---
+def make_frame(h, w, t, rng_seed=0):
+    """Synthetic traffic-like frame: textured background with moving 'vehicles'."""
+    rng = np.random.default_rng(rng_seed)
+    frame = np.full((h, w, 3), 90, dtype=np.uint8)
+    frame[:, :, 1] = 100
+    noise = rng.integers(0, 25, (h // 8 + 1, w // 8 + 1, 3), dtype=np.uint8)
+    frame += np.kron(noise, np.ones((8, 8, 1), dtype=np.uint8))[:h, :w]
+    for k in range(12):
+        bw, bh = w // 14, h // 10
+        x = int((k * w / 12 + t * (3 + k % 4)) % (w - bw))
+        y = int((k * 37 + t * (2 + k % 3)) % (h - bh))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        frame[y:y + bh, x:x + bw] = color
+    return frame
+
+def make_clip(path, h, w, frames, fps=30.0):
+    import cv2
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for t in range(frames):
+        writer.write(make_frame(h, w, t))
+    writer.release()
+    return path
+
+def _percentiles(samples_ms):
+    p50, p90, p99 = np.percentile(samples_ms, [50, 90, 99])
+    return {"p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99)}
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# --- 2. KASUS BENCHMARK (dijalankan di worker process) ---
+def bench_enhancement(method, resolution, repeat):
+    from image_enhancement import enhance_image
+
+    h, w = RESOLUTIONS[resolution]
+    img = make_frame(h, w, 0)
+    enhance_image(img, method)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        enhance_image(img, method)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    result = _percentiles(samples)
+    result["fps"] = 1000.0 / max(result["p50_ms"], 1e-9)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+def load_benchmark_model(size):
+    from ultralytics import YOLO
+
+    path = os.path.join(ROOT, "weights", f"best_{size}.pt")
+    if os.path.exists(path):
+        return YOLO(path), "trained"
+    return YOLO(MODEL_ARCH[size]), "random"
+
+def bench_video(mode, size, resolution, clip_path, batch_size):
+    import cv2
+    from image_enhancement import enhance_image
+    from detection import video_detection
+    from counting import video_counting
+
+    model, weights = load_benchmark_model(size)
+    h, w = RESOLUTIONS[resolution]
+    model.predict(make_frame(h, w, 0), imgsz=640, verbose=False)  # warm-up
+
+    cap = cv2.VideoCapture(clip_path)
+    out_path = os.path.join(tempfile.gettempdir(), f"bench_{os.getpid()}.mp4")
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (w, h))
+    try:
+        if mode == "Detection":
+            stats = video_detection(cap, model, enhance_image, "None", 0.25, writer, batch_size=batch_size)
+        else:
+            stats = video_counting(cap, model, enhance_image, "None", 0.25, writer)
+    finally:
+        cap.release()
+        writer.release()
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    return {
+        "weights": weights,
+        "frames": stats["frames"],
+        "fps": stats["fps"],
+        "stages": {name: {k: v for k, v in s.items() if k.endswith("_ms")} for name, s in stats["stages"].items()},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def bench_startup(size, resolution):
+    """Cold start in a fresh process: app-level imports, pool load + warm-up, then the first real result."""
+    t0 = time.perf_counter()
+    from model_pool import ModelPool
+    # Modul yang di-import app ikut dihitung
+    import detection
+    import counting
+    import image_enhancement
+    t_import = time.perf_counter()
+
+    weights = {}
+    def loader(_path):
+        model, weights["kind"] = load_benchmark_model(size)
+        return model
+
+    pool = ModelPool(max_models=1, loader=loader)
+    model = pool.get(f"bench_{size}")
+    h, w = RESOLUTIONS[resolution]
+    model.predict(make_frame(h, w, 0), imgsz=640, verbose=False)
+    first_result_s = time.perf_counter() - t0
+    entry = pool.stats()["models"][f"bench_{size}"]
+    return {
+        "weights": weights["kind"],
+        "import_s": t_import - t0,
+        "load_s": entry["load_s"],
+        "warmup_s": entry["warmup_s"],
+        "first_result_s": first_result_s,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def run_isolated(func, *args):
+    """Run one case in a fresh process so peak RSS is per case."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(func, *args).result()
+
+# --- 3. PERBANDINGAN BASELINE ---
+def compare(results, baseline, tolerance):
+    """Regressions vs baseline: FPS drop, p50 latency or time-to-first-result increase beyond `tolerance` (fraction)."""
+    regressions = []
+    for key, base in baseline.get("cases", {}).items():
+        current = results["cases"].get(key)
+        if current is None or "error" in current or "error" in base:
+            continue
+        if base.get("fps") and current["fps"] < base["fps"] * (1 - tolerance):
+            regressions.append(f"{key}: fps {base['fps']:.1f} -> {current['fps']:.1f}")
+        if base.get("p50_ms") and current.get("p50_ms", 0) > base["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p50 {base['p50_ms']:.2f}ms -> {current['p50_ms']:.2f}ms")
+        if base.get("first_result_s") and current.get("first_result_s", 0) > base["first_result_s"] * (1 + tolerance):
+            regressions.append(f"{key}: first result {base['first_result_s']:.2f}s -> {current['first_result_s']:.2f}s")
+        for stage, s in base.get("stages", {}).items():
+            cur = current.get("stages", {}).get(stage)
+            if cur and s.get("p50_ms", 0) > 0.5 and cur["p50_ms"] > s["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{key} [{stage}]: p50 {s['p50_ms']:.2f}ms -> {cur['p50_ms']:.2f}ms")
+    return regressions
+
+def main():
+    from image_enhancement import PROCESSORS
+
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark suite.")
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--methods", nargs="+", default=["None"] + list(PROCESSORS))
+    parser.add_argument("--sizes", nargs="+", choices=list(MODEL_ARCH), default=list(MODEL_ARCH))
+    parser.add_argument("--modes", nargs="+", choices=["Detection", "Counting"], default=["Detection", "Counting"])
+    parser.add_argument("--frames", type=int, default=90, help="Frames per generated clip")
+    parser.add_argument("--repeat", type=int, default=30, help="Repetitions per enhancement case")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--skip-models", action="store_true", help="Only benchmark enhancement")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "platform": {"python": platform.python_version(), "machine": platform.machine(),
+                     "processor": platform.processor(), "cpus": os.cpu_count()},
+        "config": vars(args),
+        "cases": {},
+    }
+
+    def record(key, func, *case_args):
+        try:
+            results["cases"][key] = run_isolated(func, *case_args)
+            case = results["cases"][key]
+            metric = f"{case['fps']:>8.1f} FPS" if "fps" in case else f"{case['first_result_s']:>8.2f} s to first result"
+            print(f"✓ {key:<40} {metric}  peak RSS {case['peak_rss_mb']:.0f} MB")
+        except Exception as e:
+            results["cases"][key] = {"error": str(e)}
+            print(f"✗ {key:<40} {e}")
+
+    for resolution in args.resolutions:
+        for method in args.methods:
+            record(f"enhance/{method}/{resolution}", bench_enhancement, method, resolution, args.repeat)
+
+    if not args.skip_models:
+        for size in args.sizes:
+            record(f"startup/{size}/{args.resolutions[0]}", bench_startup, size, args.resolutions[0])
+        with tempfile.TemporaryDirectory() as tmp:
+            for resolution in args.resolutions:
+                h, w = RESOLUTIONS[resolution]
+                clip = make_clip(os.path.join(tmp, f"clip_{resolution}.mp4"), h, w, args.frames)
+                for size in args.sizes:
+                    for mode in args.modes:
+                        record(f"video/{mode}/{size}/{resolution}", bench_video,
+                               mode, size, resolution, clip, args.batch_size)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to: {output}")
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to: {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            raise SystemExit(1)
+        print(f"\n✓ No regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+
+if __name__ == "__main__":
+    main()
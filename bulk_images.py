@@ -0,0 +1,252 @@
+import hashlib
+import io
+import os
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from detections import Detections
+from image_enhancement import parse_steps
+from profiling import Profiler
+from result_cache import CACHE_MIN_CONF, make_key
+from tiling import tiled_predict
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def _is_image(name):
+    base = os.path.basename(name)
+    return not base.startswith(".") and "__MACOSX" not in name and os.path.splitext(base)[1].lower() in IMAGE_EXTS
+
+def _upload_bytes(uploaded_file):
+    return uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+
+def count_uploads(files):
+    """Jumlah gambar di daftar upload (isi .zip dihitung dari daftar member, tanpa ekstraksi)."""
+    total = 0
+    for f in files:
+        name = getattr(f, "name", "")
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(_upload_bytes(f))) as zf:
+                total += sum(1 for info in zf.infolist() if not info.is_dir() and _is_image(info.filename))
+        elif _is_image(name):
+            total += 1
+    return total
+
+def iter_uploads(files):
+    """(nama, bytes) per gambar dari file upload dan/atau .zip; member zip dibaca satu per satu saat dibutuhkan."""
+    for f in files:
+        name = getattr(f, "name", "image.jpg")
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(_upload_bytes(f))) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir() and _is_image(info.filename):
+                        yield info.filename, zf.read(info)
+        elif _is_image(name):
+            yield name, _upload_bytes(f)
+
+class BulkDetector:
+    """
+    Deteksi untuk ratusan gambar sekaligus:
+    - decode (cv2.imdecode) + enhancement di thread pool (`workers`), dengan jumlah gambar tertahan yang dibatasi
+    - gambar dikelompokkan per ukuran: ukuran identik langsung di-`predict` per `batch_size` (letterbox rect
+      tanpa padding persegi), sisanya digabung berdasarkan rasio aspek & luas yang paling mirip
+    - hasil di-yield per gambar begitu batch-nya selesai (thumbnail JPEG + jumlah per kelas), sehingga
+      galeri bisa diisi selagi proses berjalan
+    - jika `output_dir` diisi, gambar teranotasi ditulis paralel di thread pool yang sama; `output` pada hasil
+      baru diisi setelah file benar-benar tertulis, kegagalan tulis dicatat di `write_error` & `write_failed`
+    Dengan `cache` (ResultCache) + `model_path`, gambar yang pernah dideteksi tidak diinferensi ulang.
+    """
+
+    def __init__(self, model, enhance_image, enhance_type, confidence, batch_size=16, workers=4,
+                 output_dir=None, label="None", timestamp="", tiling=None, cache=None, model_path=None,
+                 thumb_width=320, profiler=None):
+        self.model = model
+        self.enhance_image = enhance_image
+        self.enhance_type = enhance_type
+        self.confidence = confidence
+        self.batch_size = max(1, int(batch_size))
+        self.workers = max(1, int(workers))
+        self.output_dir = output_dir
+        self.label = label
+        self.timestamp = timestamp
+        self.tiling = tiling
+        self.cache = cache if model_path else None
+        self.model_path = model_path
+        self.thumb_width = thumb_width
+        self.profiler = profiler or Profiler()
+        self.n_images = 0
+        self.n_batches = 0
+        self.n_cached = 0
+        self.n_failed = 0
+        self.n_write_failed = 0
+        self._names = set()
+        self._max_held = 2 * self.batch_size
+
+    # --- 1. DECODE & ENHANCE (thread pool) ---
+    def _prepare(self, index, name, data):
+        with self.profiler.span("decode"):
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return {"index": index, "name": name, "error": "cannot decode image"}
+        digest = hashlib.sha256(data).hexdigest() if self.cache is not None else None
+        with self.profiler.span("enhance"):
+            img = self.enhance_image(img, self.enhance_type)
+        return {"index": index, "name": name, "image": img, "digest": digest}
+
+    def _cache_key(self, item):
+        tiling_key = {"tiling": repr(self.tiling)} if self.tiling is not None else {}
+        return make_key(item["digest"], self.model_path, parse_steps(self.enhance_type), imgsz=640, **tiling_key)
+
+    # --- 2. INFERENSI PER BATCH ---
+    def _predict(self, batch):
+        imgs = [item["image"] for item in batch]
+        min_conf = min(self.confidence, CACHE_MIN_CONF) if self.cache is not None else self.confidence
+        with self.profiler.span("inference", items=len(batch)):
+            if self.tiling is not None:
+                raws = tiled_predict(self.model, imgs, self.tiling, min_conf)
+            else:
+                results = self.model.predict(source=imgs, conf=min_conf, imgsz=640, verbose=False)
+                raws = [Detections.from_result(res) for res in results]
+        self.n_batches += 1
+        for item, raw in zip(batch, raws):
+            if self.cache is not None:
+                self.cache.put(self._cache_key(item), raw, min_conf)
+            yield self._finish(item, raw.filter(self.confidence))
+
+    def _output_path(self, name):
+        stem = os.path.splitext(os.path.basename(name))[0]
+        candidate, k = stem, 1
+        while candidate in self._names:
+            k += 1
+            candidate = f"{stem}_{k}"
+        self._names.add(candidate)
+        return os.path.join(self.output_dir, f"det_{self.label}_{candidate}_{self.timestamp}.jpg")
+
+    def _finish(self, item, dets, cached=False):
+        img = item.pop("image")
+        with self.profiler.span("plot"):
+            annotated = dets.plot(img)
+            if self.tiling is not None:
+                self.tiling.draw(annotated)
+            h, w = annotated.shape[:2]
+            scale = min(1.0, self.thumb_width / w)
+            thumb = cv2.resize(annotated, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+            thumb = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+        names = dets.names if isinstance(dets.names, dict) else {}
+        self.n_images += 1
+        result = {
+            "index": item["index"],
+            "name": item["name"],
+            "size": (w, h),
+            "count": len(dets),
+            "classes": dict(Counter(str(names.get(int(c), int(c))) for c in dets.cls)),
+            "thumb": thumb,
+            "output": None,
+            "cached": cached,
+            "error": None,
+            "write_error": None,
+        }
+        if self.output_dir:
+            future = self._pool.submit(self._write, self._output_path(item["name"]), annotated)
+            future.add_done_callback(lambda f, r=result: self._written(f, r))
+            self._writes.append(future)
+        return result
+
+    def _write(self, path, annotated):
+        with self.profiler.span("write"):
+            if not cv2.imwrite(path, annotated):
+                raise OSError(f"cannot write {path}")
+        return path
+
+    @staticmethod
+    def _written(future, result):
+        # Dict hasil sudah di-yield; path output baru dilaporkan bila file memang ada
+        error = future.exception()
+        if error is None:
+            result["output"] = future.result()
+        else:
+            result["write_error"] = str(error)
+
+    # --- 3. PENGELOMPOKAN UKURAN ---
+    def _take_batches(self, groups, flush=False):
+        """Batch siap jalan: grup ukuran identik yang penuh; sisanya digabung per ukuran mirip bila perlu."""
+        for shape in list(groups):
+            while len(groups[shape]) >= self.batch_size:
+                batch, groups[shape] = groups[shape][:self.batch_size], groups[shape][self.batch_size:]
+                yield batch
+            if not groups[shape]:
+                del groups[shape]
+
+        held = sum(len(g) for g in groups.values())
+        while held and (flush or held >= self._max_held):
+            # Urutkan berdasarkan rasio aspek lalu luas; ambil satu batch gambar yang paling mirip
+            pending = sorted((item for g in groups.values() for item in g),
+                             key=lambda it: (round(it["image"].shape[1] / it["image"].shape[0], 1),
+                                             it["image"].shape[0] * it["image"].shape[1]))
+            batch = pending[:self.batch_size]
+            taken = {id(item) for item in batch}
+            for shape in list(groups):
+                groups[shape] = [item for item in groups[shape] if id(item) not in taken]
+                if not groups[shape]:
+                    del groups[shape]
+            held -= len(batch)
+            yield batch
+
+    # --- 4. EKSEKUSI ---
+    def run(self, items):
+        """Yield hasil per gambar (urutan selesai, bukan urutan input) untuk iterable (nama, bytes)."""
+        self._writes = []
+        groups = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk") as pool:
+            self._pool = pool
+            pending = deque()
+            source = enumerate(items)
+            exhausted = False
+            while pending or not exhausted:
+                # Jaga jumlah gambar yang sedang di-decode tetap terbatas
+                while not exhausted and len(pending) < 2 * self.workers + self.batch_size:
+                    nxt = next(source, None)
+                    if nxt is None:
+                        exhausted = True
+                        break
+                    index, (name, data) = nxt
+                    pending.append(pool.submit(self._prepare, index, name, data))
+                if not pending:
+                    break
+
+                item = pending.popleft().result()
+                if item.get("error"):
+                    self.n_failed += 1
+                    yield {"index": item["index"], "name": item["name"], "size": None, "count": 0,
+                           "classes": {}, "thumb": None, "output": None, "cached": False, "error": item["error"],
+                           "write_error": None}
+                    continue
+                if self.cache is not None:
+                    dets = self.cache.get(self._cache_key(item), self.confidence)
+                    if dets is not None:
+                        self.n_cached += 1
+                        yield self._finish(item, dets, cached=True)
+                        continue
+                groups.setdefault(item["image"].shape, []).append(item)
+                for batch in self._take_batches(groups):
+                    yield from self._predict(batch)
+
+            for batch in self._take_batches(groups, flush=True):
+                yield from self._predict(batch)
+            for future in self._writes:
+                if future.exception() is not None:
+                    self.n_write_failed += 1
+
+    def stats(self):
+        return {
+            "images": self.n_images,
+            "batches": self.n_batches,
+            "avg_batch": (self.n_images - self.n_cached) / self.n_batches if self.n_batches else 0.0,
+            "cached": self.n_cached,
+            "failed": self.n_failed,
+            "write_failed": self.n_write_failed,
+            "profile": self.profiler.summary(),
+        }
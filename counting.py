@@ -1,139 +1,249 @@
+import time
+from functools import lru_cache
 import cv2
 import numpy as np
-
-def video_counting(cap, model, enhance_image, enhance_type, confidence, writer, stframe, progress, total_frames):
+from pipeline import FramePipeline, Stage
+from preview import LivePreview
+from zones import ZoneCounter
+from line_counter import box_centroids, lookup_classes
+from detections import Detections
+from stride import StridePolicy, TrackExtrapolator
+from profiling import Profiler
+from hud import HudPanel
+from tiling import tiled_predict
+from tracking import make_tracker, update_tracker
+from export import detection_records, crossing_events
+
+# Pemetaan kelas COCO -> label tampilan & urutan baris HUD
+CLASS_MAPPING = {
+    'car': 'Mobil',
+    'motorcycle': 'Motor',
+    'motorbike': 'Motor',
+    'bus': 'Bus',
+    'truck': 'Truk',
+    'bicycle': 'Sepeda'
+}
+DISPLAY_ORDER = ['Mobil', 'Bus', 'Truk', 'Motor', 'Sepeda']
+
+# Koordinat Kolom HUD
+_POS_NAMA   = 20
+_POS_TITIK  = 140
+_POS_ANGKA1 = 170  # Angka Turun
+_POS_GARIS  = 220  # Garis Pemisah
+_POS_ANGKA2 = 250  # Angka Naik
+
+@lru_cache(maxsize=32)
+def _count_panel(labels, n_extra):
+    """Layer statis panel hitungan (header, nama baris, pemisah) — di-cache per daftar label."""
+    y_head = 40
+    texts = [("TIPE", (_POS_NAMA, y_head)), ("TRN", (_POS_ANGKA1 - 10, y_head)),
+             ("|", (_POS_GARIS, y_head)), ("NAIK", (_POS_ANGKA2 - 10, y_head))]
+    for i, name in enumerate(labels):
+        y = 80 + 40 * i
+        texts += [(name, (_POS_NAMA, y)), (":", (_POS_TITIK, y)), ("|", (_POS_GARIS, y))]
+    return HudPanel((10, 10, 320, 290 + 40 * n_extra), texts, [((20, 50), (310, 50))])
+
+def _draw_count_hud(annotated, rows, extra_rows):
+    """
+    Panel hitungan: baris per kelas [(nama, turun, naik)] lalu baris garis/zona tambahan.
+    Hanya angka yang digambar per frame; latar & label berasal dari layer yang di-cache.
+    """
+    labels = tuple(name for name, _, _ in rows) + tuple(name[:8] for name, _, _ in extra_rows)
+    values = []
+    for i, (_, val_in, val_out) in enumerate(list(rows) + list(extra_rows)):
+        y = 80 + 40 * i
+        values += [(val_in, (_POS_ANGKA1, y)), (val_out, (_POS_ANGKA2, y))]
+    _count_panel(labels, len(extra_rows)).render(annotated, values)
+    return annotated
+
+def draw_counter_hud(annotated, counter, display_order=DISPLAY_ORDER):
+    """HUD hitungan dari state ZoneCounter: baris per kelas + baris per garis (jika > 1) & zona."""
+    # Baris tambahan per garis/zona (hanya jika lebih dari satu garis atau ada zona)
+    extra_rows = []
+    if len(counter.lines) > 1:
+        extra_rows += [(name, str(c['in']), str(c['out'])) for name, c in counter.line_counts.items()]
+    extra_rows += [(name, f"{c['in']}/{c['out']}", f"#{c['occupancy']}") for name, c in counter.zone_counts.items()]
+
+    counts = counter.counts
+    rows = [(name, str(counts[name]['in']), str(counts[name]['out'])) for name in display_order if name in counts]
+    return _draw_count_hud(annotated, rows, extra_rows)
+
+def video_counting(cap, model, enhance_image, enhance_type, confidence, writer=None, stframe=None, progress=None,
+                   total_frames=0, queue_size=4, preview=None, evict_after=90,
+                   zone_config=None, stride=None, profiler=None, metrics=None, tiling=None, export=None,
+                   cancel_check=None):
+    """
+    Menghitung kendaraan yang melewati garis/zona (tracking YOLO) di atas pipeline multi-thread.
+    Decode, enhancement, tracking, penghitungan + HUD, dan encode berjalan tumpang tindih.
+    Garis & zona diatur lewat `zone_config` (dict / JSON, lihat zones.load_zone_config);
+    default satu garis horizontal di tengah frame.
+    Penghitungan memakai ZoneCounter (vektor per frame, ID yang hilang > `evict_after` frame dibuang).
+    Dengan `stride` (StridePolicy) tracking hanya dijalankan pada keyframe; box di antaranya diekstrapolasi
+    (kecepatan konstan). Counter hanya diberi posisi nyata dari keyframe: uji lintasan segmen antar keyframe
+    tetap menangkap garis yang dilewati selama frame interpolasi.
+    Dengan `tiling` (tiling.TilingPolicy) deteksi dijalankan per ROI / tile (satu predict per frame, digabung NMS
+    lintas tile) lalu di-track dengan ByteTrack tersendiri, karena model.track hanya bekerja pada frame utuh.
+    Dengan `export` (export.open_sink) setiap frame ditulis sebagai record (box ber-ID, label, event lintasan
+    garis/zona) secara inkremental; ringkasan hitungan akhir ditulis saat selesai.
+    `cancel_check()` dipanggil di sink untuk setiap frame (tidak bergantung pada `total_frames`); exception
+    yang dilemparnya menghentikan pipeline, mis. JobCancelled untuk job latar belakang.
+    Setiap stage (decode, enhance, tracking, plot, counting, hud, write, encode, preview) dicatat ke `profiler`;
+    statistik bergulir ditampilkan di `metrics` selama proses berjalan.
+    Mengembalikan hitungan akhir, statistik throughput, waktu per stage & kedalaman queue.
+    """
     frame_idx = 0
+    start_time = time.perf_counter()
+    profiler = profiler or Profiler()
+    live = LivePreview(stframe, progress, total_frames, preview, profiler=profiler, metrics=metrics)
     
     # --- 1. KONFIGURASI KELAS ---
-    class_mapping = {
-        'car': 'Mobil',
-        'motorcycle': 'Motor',
-        'motorbike': 'Motor',
-        'bus': 'Bus',
-        'truck': 'Truk',
-        'bicycle': 'Sepeda'
-    }
-    
-    # Inisialisasi hitungan berdasarkan values unik
-    unique_names = list(set(class_mapping.values()))
-    counts = {name: {'in': 0, 'out': 0} for name in unique_names}
-    
-    counted_ids = set()
-    previous_positions = {}
-
-    # --- 2. LOOPING VIDEO ---
-    while True:
+    # Inisialisasi counter (tabel class-id dibangun sekali dari model.names)
+    counter = ZoneCounter(model.names, CLASS_MAPPING, DISPLAY_ORDER, config=zone_config, evict_after=evict_after)
+    n_annotated = 0
+    policy = stride or StridePolicy()
+    extrapolator = TrackExtrapolator()
+    n_tracked = 0
+    n_keyframes = 0
+    tracker = None
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if tiling is not None:
+        tracker = make_tracker((video_fps or 30.0) / policy.max_stride)
+
+    # --- 2. DEFINISI STAGE ---
+    def read_frame():
         ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame_idx += 1
+        return frame if ret else None
 
+    def enhance(frame):
         # Pre-processing
-        frame_proc = enhance_image(frame, enhance_type)
+        return enhance_image(frame, enhance_type)
+
+    def track(frame_proc):
+        nonlocal n_tracked, n_keyframes
+        n_tracked += 1
+        if not policy.is_keyframe():
+            # Frame interpolasi: ekstrapolasi box dari keyframe terakhir
+            return frame_proc, None, extrapolator.predict(n_tracked)
+
+        if tracker is not None:
+            # Deteksi per ROI / tile lalu tracking ByteTrack mandiri
+            res = dets = update_tracker(tracker, tiled_predict(model, [frame_proc], tiling, confidence)[0], frame_proc)
+        else:
+            # Tracking YOLO (harus berurutan per frame agar state tracker konsisten)
+            results = model.track(
+                source=frame_proc,
+                conf=confidence,
+                imgsz=640,
+                verbose=False,
+                persist=True
+            )
+            res = results[0]
+            dets = Detections.from_result(res)
+        n_keyframes += 1
+        if policy.max_stride > 1:
+            height, width = frame_proc.shape[:2]
+            extrapolator.observe(dets, n_tracked, diagonal=float(np.hypot(width, height)))
+            policy.observe(len(dets), extrapolator.motion)
+        return frame_proc, res, dets
+
+    def annotate(item):
+        nonlocal n_annotated
+        n_annotated += 1
+        frame_proc, res, dets = item
         height, width = frame_proc.shape[:2]
-        line_y = int(height / 2) # Garis tengah
-
-        # Tracking YOLO
-        results = model.track(
-            source=frame_proc,
-            conf=confidence,
-            imgsz=640,
-            verbose=False,
-            persist=True
-        )
+        counter.resolve(width, height) # Geometri garis/zona dihitung sekali
 
-        res = results[0]
-        annotated = res.plot() if hasattr(res, "plot") else frame_proc.copy()
+        t_plot = time.perf_counter()
+        if res is not None and not isinstance(res, Detections):
+            annotated = res.plot() if hasattr(res, "plot") else frame_proc.copy()
+        else:
+            annotated = dets.plot(frame_proc)
+        if tiling is not None:
+            tiling.draw(annotated)
 
         # --- 3. LOGIKA PENGHITUNGAN ---
-        if getattr(res, "boxes", None) is not None and getattr(res.boxes, "id", None) is not None:
-            boxes = res.boxes
-            ids = boxes.id.cpu().numpy().tolist() if hasattr(boxes.id, "cpu") else list(boxes.id)
-            xyxy = boxes.xyxy.cpu().numpy() if hasattr(boxes.xyxy, "cpu") else np.array(boxes.xyxy)
-            classes = boxes.cls.cpu().numpy() if hasattr(boxes.cls, "cpu") else np.array(boxes.cls)
-
-            for obj_id, box, cls_id in zip(ids, xyxy, classes):
-                raw_name = model.names[int(cls_id)]
-                model_class_name = raw_name.lower()
-                
-                if model_class_name in class_mapping:
-                    display_name = class_mapping[model_class_name]
-                    x1, y1, x2, y2 = box
-                    cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
-
-                    if obj_id in previous_positions:
-                        prev_cy = previous_positions[obj_id]
-
-                        if obj_id not in counted_ids:
-                            # Logika: Melewati garis dari Atas ke Bawah (Turun/Masuk)
-                            if prev_cy < line_y and cy >= line_y:
-                                counts[display_name]['in'] += 1
-                                counted_ids.add(obj_id)
-                                cv2.line(annotated, (0, line_y), (width, line_y), (0, 255, 0), 5)
-                            
-                            # Logika: Melewati garis dari Bawah ke Atas (Naik/Keluar)
-                            elif prev_cy > line_y and cy <= line_y:
-                                counts[display_name]['out'] += 1
-                                counted_ids.add(obj_id)
-                                cv2.line(annotated, (0, line_y), (width, line_y), (255, 255, 0), 5)
-
-                    previous_positions[obj_id] = cy
-                    cv2.circle(annotated, (cx, cy), 6, (0, 255, 0), -1)
+        t_count = time.perf_counter()
+        profiler.record("plot", t_plot, t_count)
+        result = None
+        if res is not None:
+            # Update counter tetap dipanggil saat tidak ada box agar eviction ID berjalan
+            tracked = dets if dets.ids is not None else Detections(ids=np.empty(0))
+            result = counter.update(tracked.ids, tracked.xyxy, tracked.cls, n_annotated)
+            centroids, valid = result.centroids, result.valid
+        else:
+            centroids = box_centroids(dets.xyxy)
+            valid = lookup_classes(counter.class_table, dets.cls) >= 0
+            if dets.ids is None:
+                valid[:] = False
+
+        for cx, cy in centroids[valid]:
+            cv2.circle(annotated, (int(cx), int(cy)), 6, (0, 255, 0), -1)
+
+        if export is not None:
+            t_export = time.perf_counter()
+            label_idx = lookup_classes(counter.class_table, dets.cls)
+            labels = [counter.labels[k] if k >= 0 else None for k in label_idx]
+            export.write({
+                "frame": n_annotated,
+                "t": round((n_annotated - 1) / video_fps, 3) if video_fps else None,
+                "keyframe": res is not None,
+                "detections": detection_records(dets, labels),
+                "events": crossing_events(result, tracked.ids, counter, label_idx) if result is not None else [],
+            })
+            profiler.record("export", t_export, time.perf_counter())
 
         # --- 4. TAMPILAN HUD ---
-        # Garis Batas
-        cv2.line(annotated, (0, line_y), (width, line_y), (0, 0, 255), 2)
-
-        # Konfigurasi Tampilan
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        scale = 0.8
-        thick = 2
-        color_txt = (255, 255, 255)
-        
-        # Koordinat Kolom
-        pos_nama    = 20
-        pos_titik   = 140
-        pos_angka1  = 170  # Angka Turun
-        pos_garis   = 220  # Garis Pemisah
-        pos_angka2  = 250  # Angka Naik
-
-        # Background Kotak Transparan
-        overlay = annotated.copy()
-        cv2.rectangle(overlay, (10, 10), (320, 290), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.5, annotated, 0.5, 0, annotated)
-
-        # Gambar Header
-        y_head = 40
-        cv2.putText(annotated, "TIPE", (pos_nama, y_head), font, scale, color_txt, thick)
-        cv2.putText(annotated, "TRN",  (pos_angka1 - 10, y_head), font, scale, color_txt, thick)
-        cv2.putText(annotated, "|",    (pos_garis, y_head), font, scale, color_txt, thick)
-        cv2.putText(annotated, "NAIK", (pos_angka2 - 10, y_head), font, scale, color_txt, thick)
-        
-        # Garis Bawah Header
-        cv2.line(annotated, (20, 50), (310, 50), color_txt, 2)
-
-        # Gambar Data (Looping per Baris)
-        y_offset = 80
-        display_order = ['Mobil', 'Bus', 'Truk', 'Motor', 'Sepeda']
-        
-        for name in display_order:
-            if name in counts:
-                data = counts[name]
-
-                cv2.putText(annotated, name,              (pos_nama, y_offset),   font, scale, color_txt, thick)
-                cv2.putText(annotated, ":",               (pos_titik, y_offset),  font, scale, color_txt, thick)
-                cv2.putText(annotated, str(data['in']),   (pos_angka1, y_offset), font, scale, color_txt, thick)
-                cv2.putText(annotated, "|",               (pos_garis, y_offset),  font, scale, color_txt, thick)
-                cv2.putText(annotated, str(data['out']),  (pos_angka2, y_offset), font, scale, color_txt, thick)
-
-                y_offset += 40
-
-        # Output ke Streamlit
-        stframe.image(cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB), use_container_width=True)
-        
-        if total_frames > 0:
-            progress.progress(min(frame_idx / total_frames, 1.0))
+        t_hud = time.perf_counter()
+        profiler.record("counting", t_count, t_hud)
 
+        # Garis Batas & Zona
+        counter.draw(annotated, result)
+
+        draw_counter_hud(annotated, counter)
+
+        profiler.record("hud", t_hud, time.perf_counter())
+        return annotated
+
+    def write_frame(annotated):
         if writer:
-            writer.write(annotated)
\ No newline at end of file
+            writer.write(annotated)
+        return annotated
+
+    def show(annotated):
+        nonlocal frame_idx
+        frame_idx += 1
+
+        # Output ke Streamlit (di-throttle sesuai PreviewPolicy)
+        live.update(frame_idx, annotated)
+        if cancel_check is not None:
+            cancel_check()
+
+    # --- 5. EKSEKUSI PIPELINE ---
+    pipeline = FramePipeline(read_frame, [
+        Stage("enhance", enhance),
+        Stage("tracking", track),
+        Stage("annotate", annotate),
+        Stage("write", write_frame),
+    ], queue_size=queue_size, profiler=profiler)
+    # Waktu annotate sudah tercatat per bagian; encode sebenarnya dicatat oleh thread AsyncVideoWriter
+    profiler.composite("annotate")
+    stats = pipeline.run(show)
+    live.finish(frame_idx)
+
+    elapsed = time.perf_counter() - start_time
+    stats.update({
+        "frames": frame_idx,
+        "seconds": elapsed,
+        "fps": frame_idx / elapsed if elapsed > 0 else 0.0,
+        "keyframes": n_keyframes,
+        "profile": profiler.summary(),
+        "bottleneck": profiler.bottleneck(),
+        "counts": counter.counts,
+        "lines": counter.line_counts,
+        "zones": counter.zone_counts,
+    })
+    if export is not None:
+        summary = {key: stats[key] for key in ("counts", "lines", "zones", "keyframes", "fps")}
+        export.finish({**summary, "video_fps": video_fps})
+        stats["export"] = export.path
+    return stats
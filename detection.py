@@ -1,49 +1,159 @@
+import time
 import cv2
+from pipeline import FramePipeline, Stage
+from preview import LivePreview
+from detections import Detections
+from stride import StridePolicy, TrackExtrapolator
+from profiling import Profiler
+from hud import get_panel
+from tiling import tiled_predict
+from export import detection_records
 
-def video_detection(cap, model, enhance_image, enhance_type, confidence, writer, stframe, progress, total_frames):
+def _plot_result(res, frame_proc):
+    """Gambar bounding box YOLO pada satu frame; mengembalikan (frame, jumlah deteksi)."""
+    if isinstance(res, Detections):  # hasil tiling / ROI
+        return res.plot(frame_proc), len(res)
+    # Menggunakan plot() bawaan YOLO, lalu ditimpa dengan info tambahan
+    annotated = res.plot() if hasattr(res, "plot") else frame_proc.copy()
+    count = len(res.boxes) if hasattr(res, "boxes") else 0
+    return annotated, count
+
+def _draw_hud(annotated, count):
+    """HUD jumlah deteksi di pojok kiri atas."""
+    # Background Transparan Hitam (hanya ROI panel yang di-blend) + teks jumlah dari sprite cache
+    text_info = f"Detected: {count}"
+    return get_panel((10, 10, 280, 70), scale=1.0).render(annotated, [(text_info, (25, 50))])
+
+def video_detection(cap, model, enhance_image, enhance_type, confidence, writer=None, stframe=None, progress=None,
+                    total_frames=0, batch_size=1, queue_size=4, preview=None, stride=None,
+                    profiler=None, metrics=None, tiling=None, export=None, cancel_check=None):
+    """
+    Deteksi objek per video secara batch di atas pipeline multi-thread.
+    Decode, enhancement, inferensi (`model.predict` sekali per `batch_size` frame), anotasi, dan encode
+    berjalan tumpang tindih; frame tetap ditulis sesuai urutan aslinya.
+    Dengan `stride` (StridePolicy) model hanya dijalankan pada keyframe; frame di antaranya
+    memakai box keyframe terakhir (hold).
+    Dengan `tiling` (tiling.TilingPolicy) inferensi dibatasi ke ROI dan/atau tile 640 yang tumpang tindih;
+    seluruh crop dari satu batch frame dijalankan dalam satu panggilan predict lalu digabung dengan NMS lintas tile.
+    Dengan `export` (export.open_sink) setiap frame ditulis sebagai record (box, skor, kelas, timestamp video)
+    secara inkremental, dan ringkasan akhir ditulis saat selesai.
+    `cancel_check()` dipanggil di sink untuk setiap frame (tidak bergantung pada `total_frames`); exception
+    yang dilemparnya menghentikan pipeline, mis. JobCancelled untuk job latar belakang.
+    Setiap stage (decode, enhance, inference, plot, hud, write, encode, preview) dicatat ke `profiler`
+    (profiling.Profiler); statistik bergulir ditampilkan di `metrics` selama proses berjalan.
+    Mengembalikan statistik throughput (FPS) beserta waktu per stage & kedalaman queue.
+    """
+    batch_size = max(1, int(batch_size))
     frame_idx = 0
+    start_time = time.perf_counter()
+    profiler = profiler or Profiler()
+    live = LivePreview(stframe, progress, total_frames, preview, profiler=profiler, metrics=metrics)
+    policy = stride or StridePolicy()
+    extrapolator = TrackExtrapolator()
+    n_keyframes = 0
+    n_annotated = 0
+    video_fps = (cap.get(cv2.CAP_PROP_FPS) or 0.0) if export is not None else 0.0
 
-    while True:
+    # --- 1. DEFINISI STAGE ---
+    def read_frame():
         ret, frame = cap.read()
-        if not ret:
-            break
+        return frame if ret else None
 
-        frame_idx += 1
+    def enhance(frame):
+        return enhance_image(frame, enhance_type)
+
+    def infer(frames):
+        nonlocal n_keyframes
+        # Hanya keyframe yang dikirim ke model; satu panggilan predict untuk seluruh batch
+        keys = [policy.is_keyframe() for _ in frames]
+        key_frames = [f for f, k in zip(frames, keys) if k]
+        results = []
+        if key_frames and tiling is not None:
+            results = tiled_predict(model, key_frames, tiling, confidence)
+        elif key_frames:
+            results = model.predict(
+                source=key_frames,
+                conf=confidence,
+                imgsz=640,
+                verbose=False
+            )
+        n_keyframes += len(key_frames)
+        for res in results:
+            policy.observe(len(res) if isinstance(res, Detections) else len(getattr(res, "boxes", ())))
+
+        results = iter(results)
+        return [(f, next(results) if k else None) for f, k in zip(frames, keys)]
+
+    def annotate(item):
+        nonlocal n_annotated
+        n_annotated += 1
+        frame_proc, res = item
+        dets = None
+        if res is not None:
+            if policy.max_stride > 1 or export is not None:
+                dets = res if isinstance(res, Detections) else Detections.from_result(res)
+            if policy.max_stride > 1:
+                extrapolator.observe(dets, n_annotated)
+            with profiler.span("plot"):
+                annotated, count = _plot_result(res, frame_proc)
+        else:
+            # Frame non-keyframe: gambar box perkiraan dari keyframe terakhir
+            dets = extrapolator.predict(n_annotated)
+            with profiler.span("plot"):
+                annotated, count = dets.plot(frame_proc), len(dets)
+
+        if export is not None:
+            with profiler.span("export"):
+                export.write({
+                    "frame": n_annotated,
+                    "t": round((n_annotated - 1) / video_fps, 3) if video_fps else None,
+                    "keyframe": res is not None,
+                    "detections": detection_records(dets),
+                })
 
-        # 1. Image Enhancement
-        frame_proc = enhance_image(frame, enhance_type)
-
-        # 2. YOLOv11 Detection
-        results = model.predict(
-            source=frame_proc, 
-            conf=confidence, 
-            imgsz=640, 
-            verbose=False
-        )
-        res = results[0]
-
-        # 3. Visualisasi (Bounding Boxes)
-        # Menggunakan plot() bawaan YOLO, lalu ditimpa dengan info tambahan
-        annotated = res.plot() if hasattr(res, "plot") else frame_proc.copy()
-        count = len(res.boxes) if hasattr(res, "boxes") else 0
-
-        # 4. Tambahan HUD 
-        # Background Transparan Hitam
-        overlay = annotated.copy()
-        cv2.rectangle(overlay, (10, 10), (280, 70), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.5, annotated, 0.5, 0, annotated)
-
-        # Teks Jumlah Deteksi
-        text_info = f"Detected: {count}"
-        cv2.putText(annotated, text_info, (25, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
-
-        # 5. Render ke Streamlit
-        stframe.image(cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB), use_container_width=True)
-        
-        # Update Progress Bar (Safe Check)
-        if total_frames > 0:
-            progress.progress(min(frame_idx / total_frames, 1.0))
-
-        # 6. Simpan Video (Jika mencentang Save)
+        if tiling is not None:
+            tiling.draw(annotated)
+        with profiler.span("hud"):
+            return _draw_hud(annotated, count)
+
+    def write_frame(annotated):
+        # Simpan Video (Jika mencentang Save)
         if writer:
-            writer.write(annotated)
\ No newline at end of file
+            writer.write(annotated)
+        return annotated
+
+    def show(annotated):
+        nonlocal frame_idx
+        frame_idx += 1
+
+        # Render ke Streamlit & Update Progress Bar (di-throttle sesuai PreviewPolicy)
+        live.update(frame_idx, annotated)
+        if cancel_check is not None:
+            cancel_check()
+
+    # --- 2. EKSEKUSI PIPELINE ---
+    pipeline = FramePipeline(read_frame, [
+        Stage("enhance", enhance),
+        Stage("inference", infer, batch_size=batch_size),
+        Stage("annotate", annotate),
+        Stage("write", write_frame),
+    ], queue_size=queue_size, profiler=profiler)
+    # Waktu annotate sudah tercatat per bagian; encode sebenarnya dicatat oleh thread AsyncVideoWriter
+    profiler.composite("annotate")
+    stats = pipeline.run(show)
+    live.finish(frame_idx)
+
+    elapsed = time.perf_counter() - start_time
+    stats.update({
+        "frames": frame_idx,
+        "seconds": elapsed,
+        "fps": frame_idx / elapsed if elapsed > 0 else 0.0,
+        "batch_size": batch_size,
+        "keyframes": n_keyframes,
+        "profile": profiler.summary(),
+        "bottleneck": profiler.bottleneck(),
+    })
+    if export is not None:
+        export.finish({"video_fps": video_fps, "keyframes": n_keyframes, "fps": stats["fps"]})
+        stats["export"] = export.path
+    return stats
@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+
+# Palet warna per kelas (BGR)
+_PALETTE = np.array([
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+], dtype=np.uint8)
+
+def _to_numpy(value, dtype):
+    if value is None:
+        return None
+    if hasattr(value, "cpu"):
+        value = value.cpu().numpy()
+    return np.asarray(value, dtype=dtype)
+
+class Detections:
+    """
+    Hasil deteksi ringan berbasis array NumPy (xyxy, conf, cls, ids opsional),
+    tidak bergantung pada objek Results Ultralytics sehingga bisa dibuat dari
+    interpolasi, cache, tiling, dsb.
+    """
+
+    def __init__(self, xyxy=None, conf=None, cls=None, ids=None, names=None):
+        self.xyxy = np.asarray(xyxy if xyxy is not None else np.empty((0, 4)), dtype=np.float32).reshape(-1, 4)
+        n = len(self.xyxy)
+        self.conf = np.asarray(conf if conf is not None else np.ones(n), dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls if cls is not None else np.zeros(n), dtype=np.int64).reshape(-1)
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int64).reshape(-1)
+        self.names = names or {}
+
+    @classmethod
+    def from_result(cls, res):
+        """Konversi satu objek Results Ultralytics (predict / track) ke Detections."""
+        boxes = getattr(res, "boxes", None)
+        names = getattr(res, "names", None)
+        if boxes is None or len(boxes) == 0:
+            return cls(names=names)
+        return cls(
+            _to_numpy(boxes.xyxy, np.float32),
+            _to_numpy(boxes.conf, np.float32),
+            _to_numpy(boxes.cls, np.float32).astype(np.int64),
+            _to_numpy(getattr(boxes, "id", None), np.float32),
+            names,
+        )
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    def __getitem__(self, mask):
+        return Detections(self.xyxy[mask], self.conf[mask], self.cls[mask],
+                          None if self.ids is None else self.ids[mask], self.names)
+
+    def filter(self, confidence):
+        """Hanya deteksi dengan skor >= confidence."""
+        return self[self.conf >= confidence]
+
+    def plot(self, img, copy=True):
+        """Gambar bounding box + label (gaya mirip Results.plot())."""
+        out = img.copy() if copy else img
+        thick = max(2, int(round(sum(out.shape[:2]) / 2 * 0.003)))
+        for i, (x1, y1, x2, y2) in enumerate(self.xyxy.astype(int)):
+            cls_id = int(self.cls[i])
+            color = tuple(int(c) for c in _PALETTE[cls_id % len(_PALETTE)])
+            label = str(self.names.get(cls_id, cls_id)) if isinstance(self.names, dict) else str(cls_id)
+            if self.ids is not None:
+                label = f"id:{int(self.ids[i])} {label}"
+            label = f"{label} {self.conf[i]:.2f}"
+
+            cv2.rectangle(out, (x1, y1), (x2, y2), color, thick, cv2.LINE_AA)
+            (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, thick / 3, max(thick - 1, 1))
+            top = y1 - th - 3 >= 0
+            y_text = y1 - 2 if top else y1 + th + 2
+            cv2.rectangle(out, (x1, y_text - th - 2), (x1 + tw, y_text + 2), color, -1, cv2.LINE_AA)
+            cv2.putText(out, label, (x1, y_text), cv2.FONT_HERSHEY_SIMPLEX, thick / 3, (255, 255, 255),
+                        max(thick - 1, 1), cv2.LINE_AA)
+        return out
+
+def box_iou(a, b):
+    """Matriks IoU (N, M) antara dua array box xyxy."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    area_a = (a[:, 2] - a[:, 0]).clip(0) * (a[:, 3] - a[:, 1]).clip(0)
+    area_b = (b[:, 2] - b[:, 0]).clip(0) * (b[:, 3] - b[:, 1]).clip(0)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = (rb - lt).clip(0).prod(axis=2)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+def box_ios(a, b):
+    """Matriks intersection-over-smaller (N, M): 1.0 jika satu box berada di dalam box lain."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    area_a = (a[:, 2] - a[:, 0]).clip(0) * (a[:, 3] - a[:, 1]).clip(0)
+    area_b = (b[:, 2] - b[:, 0]).clip(0) * (b[:, 3] - b[:, 1]).clip(0)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = (rb - lt).clip(0).prod(axis=2)
+    smaller = np.minimum(area_a[:, None], area_b[None, :])
+    return np.where(smaller > 0, inter / np.maximum(smaller, 1e-9), 0.0).astype(np.float32)
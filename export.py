@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import Counter
+import numpy as np
+
+def detection_records(dets, labels=None):
+    """Detections -> list dict per box (id, kelas, label tampilan, skor, box xyxy)."""
+    names = dets.names if isinstance(dets.names, dict) else dict(enumerate(dets.names or []))
+    out = []
+    for i in range(len(dets)):
+        cls_id = int(dets.cls[i])
+        rec = {
+            "id": int(dets.ids[i]) if dets.ids is not None else None,
+            "cls": names.get(cls_id, cls_id),
+            "conf": round(float(dets.conf[i]), 4),
+            "box": [round(float(v), 1) for v in dets.xyxy[i]],
+        }
+        if labels is not None:
+            rec["label"] = labels[i]
+        out.append(rec)
+    return out
+
+def crossing_events(result, ids, counter, label_idx):
+    """Event lintasan garis / zona dari satu CountResult (ZoneCounter.update)."""
+    events = []
+    if result is None:
+        return events
+    groups = (("line_in", result.line_in, counter.lines), ("line_out", result.line_out, counter.lines),
+              ("zone_in", result.zone_in, counter.zones), ("zone_out", result.zone_out, counter.zones))
+    for kind, flags, items in groups:
+        if flags is None or not flags.size:
+            continue
+        for row, col in zip(*np.nonzero(flags)):
+            events.append({"type": kind, "name": items[col].name, "id": int(ids[row]),
+                           "label": counter.labels[label_idx[row]]})
+    return events
+
+class RecordSink(ABC):
+    """
+    Sink append-only untuk record per frame. Record ditulis langsung (buffer file, di-flush setiap
+    `flush_every` record) sehingga memori konstan untuk video berjam-jam; hanya agregat ringkas
+    (jumlah frame, deteksi per kelas, event per tipe) yang disimpan.
+    Ringkasan akhir ditulis ke `<nama>.summary.json` oleh `finish()`.
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = max(1, int(flush_every))
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.summary_path = f"{os.path.splitext(path)[0]}.summary.json"
+        self.frames = 0
+        self.detections = 0
+        self.classes = Counter()
+        self.events = Counter()
+        self.max_track_id = None
+        self._pending = 0
+        self._closed = False
+        self._file = open(path, "a", newline="", encoding="utf-8")
+
+    def write(self, record):
+        """Tambahkan satu record frame: {"frame", "t", "keyframe", "detections": [...], "events": [...]}."""
+        self.frames += 1
+        dets = record.get("detections", [])
+        self.detections += len(dets)
+        for det in dets:
+            self.classes[det.get("label") or str(det["cls"])] += 1
+            if det.get("id") is not None:
+                self.max_track_id = max(self.max_track_id or 0, det["id"])
+        for event in record.get("events", []):
+            self.events[event["type"]] += 1
+        self._write(record)
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    @abstractmethod
+    def _write(self, record):
+        """Serialisasi satu record frame ke `self._file` (format per subclass)."""
+
+    def aggregate(self):
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "detections_per_class": dict(self.classes),
+            "events": dict(self.events),
+            "max_track_id": self.max_track_id,
+        }
+
+    def finish(self, summary=None):
+        """Tulis ringkasan akhir (agregat sink + `summary` dari pemanggil) lalu tutup file."""
+        if self._closed:
+            return None
+        result = {"records": self.path, **self.aggregate(), **(summary or {})}
+        self._write_summary(result)
+        self._file.close()
+        self._closed = True
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, default=str)
+        return result
+
+    def _write_summary(self, summary):
+        pass
+
+    def close(self):
+        if not self._closed:
+            self._file.close()
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class JsonlSink(RecordSink):
+    """Satu objek JSON per frame per baris; ringkasan juga ditambahkan sebagai baris terakhir (type=summary)."""
+
+    def _write(self, record):
+        self._file.write(json.dumps({"type": "frame", **record}, separators=(",", ":"), default=str))
+        self._file.write("\n")
+
+    def _write_summary(self, summary):
+        self._file.write(json.dumps({"type": "summary", **summary}, default=str))
+        self._file.write("\n")
+
+class CsvSink(RecordSink):
+    """
+    Format kolom: satu baris per deteksi (frame tanpa deteksi tetap satu baris kosong),
+    event lintasan milik track tersebut digabung di kolom `events` (mis. "line_in:L1;zone_in:Parkir").
+    """
+
+    COLUMNS = ["frame", "t", "keyframe", "id", "cls", "label", "conf", "x1", "y1", "x2", "y2", "events"]
+
+    def __init__(self, path, flush_every=100):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        super().__init__(path, flush_every)
+        self._csv = csv.writer(self._file)
+        if new_file:
+            self._csv.writerow(self.COLUMNS)
+
+    def _write(self, record):
+        base = [record["frame"], record.get("t"), int(bool(record.get("keyframe", True)))]
+        by_id = {}
+        for event in record.get("events", []):
+            by_id.setdefault(event["id"], []).append(f"{event['type']}:{event['name']}")
+        dets = record.get("detections", [])
+        if not dets:
+            self._csv.writerow(base + [""] * (len(self.COLUMNS) - len(base)))
+        for det in dets:
+            self._csv.writerow(base + [
+                det["id"] if det["id"] is not None else "", det["cls"], det.get("label", ""), det["conf"],
+                *det["box"], ";".join(by_id.get(det["id"], [])),
+            ])
+
+SINKS = {".jsonl": JsonlSink, ".csv": CsvSink}
+
+def open_sink(path, flush_every=100):
+    """Sink sesuai ekstensi file: .jsonl atau .csv."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINKS:
+        raise ValueError(f"Unsupported export format '{ext}' (use {', '.join(SINKS)})")
+    return SINKS[ext](path, flush_every)
@@ -0,0 +1,100 @@
+from functools import lru_cache
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+def _coverage_points(coverage):
+    """Koordinat piksel dengan coverage > 0 beserta alpha-nya (N, 1) — dihitung sekali per layer."""
+    ys, xs = np.nonzero(coverage)
+    alpha = coverage[ys, xs].astype(np.float32)[:, None] * (1.0 / 255.0)
+    for arr in (ys, xs, alpha):
+        arr.flags.writeable = False
+    return ys, xs, alpha
+
+@lru_cache(maxsize=1024)
+def _text_sprite(text, scale, thick, font=FONT):
+    """
+    Coverage teks (hasil cv2.putText sekali pada kanvas hitam) sebagai titik + alpha, dengan
+    offset terhadap origin putText. Menempelkan alpha ini = menggambar teks yang sama dengan cv2.putText.
+    """
+    (tw, th), baseline = cv2.getTextSize(text, font, scale, thick)
+    pad = thick + 2
+    canvas = np.zeros((th + baseline + 2 * pad, tw + 2 * pad), dtype=np.uint8)
+    cv2.putText(canvas, text, (pad, pad + th), font, scale, 255, thick)
+    ys, xs, alpha = _coverage_points(canvas)
+    return ys - (pad + th), xs - pad, alpha, _bounds(ys - (pad + th), xs - pad)
+
+def _bounds(ys, xs):
+    return (int(ys.min()), int(ys.max()), int(xs.min()), int(xs.max())) if len(ys) else (0, -1, 0, -1)
+
+def _blend_points(img, ys, xs, alpha, color, bounds):
+    """
+    Alpha-blend `color` ke piksel (ys, xs) pada `img` (in-place), dipotong ke batas gambar.
+    `bounds` = (y_min, y_max, x_min, x_max) titik-titik tersebut (dihitung sekali per layer).
+    """
+    h, w = img.shape[:2]
+    y_min, y_max, x_min, x_max = bounds
+    if y_min < 0 or x_min < 0 or y_max >= h or x_max >= w:
+        keep = (ys >= 0) & (xs >= 0) & (ys < h) & (xs < w)
+        ys, xs, alpha = ys[keep], xs[keep], alpha[keep]
+    if not len(ys):
+        return
+    px = img[ys, xs].astype(np.float32)
+    img[ys, xs] = (px + (np.asarray(color, dtype=np.float32) - px) * alpha + 0.5).astype(np.uint8)
+
+def draw_text(img, text, org, scale=1.0, color=(255, 255, 255), thick=2):
+    """Pengganti cv2.putText memakai sprite teks yang di-cache."""
+    ys, xs, alpha, (y_min, y_max, x_min, x_max) = _text_sprite(text, scale, thick)
+    x, y = org
+    _blend_points(img, ys + y, xs + x, alpha, color, (y_min + y, y_max + y, x_min + x, x_max + x))
+
+class HudPanel:
+    """
+    Panel HUD semi-transparan dengan layer statis yang di-cache.
+    - hanya ROI panel yang di-blend (bukan copy + addWeighted satu frame penuh)
+    - teks & garis statis (header, label) dirender sekali ke layer coverage
+    - nilai yang berubah digambar per frame dari sprite teks yang di-cache
+    Biaya per frame hanya bergantung pada ukuran panel, bukan resolusi frame. Hasilnya setara dengan
+    copy + addWeighted + putText (selisih maks. 1 level pada piksel teks yang bertumpuk);
+    teks statis dipotong ke area panel.
+    """
+
+    def __init__(self, rect, texts=(), lines=(), alpha=0.5, scale=0.8, thick=2, color=(255, 255, 255)):
+        self.x1, self.y1, self.x2, self.y2 = rect
+        self.alpha = alpha
+        self.scale = scale
+        self.thick = thick
+        self.color = color
+
+        # Layer statis: coverage teks/garis dalam koordinat panel
+        h, w = self.y2 - self.y1 + 1, self.x2 - self.x1 + 1  # cv2.rectangle inklusif
+        layer = np.zeros((h, w), dtype=np.uint8)
+        for text, (x, y) in texts:
+            cv2.putText(layer, text, (x - self.x1, y - self.y1), FONT, scale, 255, thick)
+        for (ax, ay), (bx, by) in lines:
+            cv2.line(layer, (ax - self.x1, ay - self.y1), (bx - self.x1, by - self.y1), 255, thick)
+        ys, xs, self._static_alpha = _coverage_points(layer)
+        self._static_ys, self._static_xs = ys + self.y1, xs + self.x1
+        self._static_bounds = _bounds(self._static_ys, self._static_xs)
+        self._black = np.zeros((h, w, 3), dtype=np.uint8)
+
+    def render(self, img, values=()):
+        """Gambar panel ke `img` (in-place); `values` = [(teks, (x, y)), ...] yang berubah per frame."""
+        h, w = img.shape[:2]
+        x0, y0 = max(self.x1, 0), max(self.y1, 0)
+        x1, y1 = min(self.x2 + 1, w), min(self.y2 + 1, h)
+        if x0 < x1 and y0 < y1:
+            roi = img[y0:y1, x0:x1]
+            sy, sx = slice(y0 - self.y1, y1 - self.y1), slice(x0 - self.x1, x1 - self.x1)
+            cv2.addWeighted(self._black[sy, sx], self.alpha, roi, 1.0 - self.alpha, 0, dst=roi)
+        _blend_points(img, self._static_ys, self._static_xs, self._static_alpha, self.color, self._static_bounds)
+
+        for text, org in values:
+            draw_text(img, text, org, self.scale, self.color, self.thick)
+        return img
+
+@lru_cache(maxsize=32)
+def get_panel(rect, texts=(), lines=(), alpha=0.5, scale=0.8, thick=2, color=(255, 255, 255)):
+    """HudPanel yang di-cache per layout (argumen harus hashable: tuple)."""
+    return HudPanel(rect, texts, lines, alpha, scale, thick, color)
@@ -1,18 +1,51 @@
+import threading
+from functools import lru_cache
 import cv2
 import numpy as np
 
+# --- STATE TERKOMPILASI (dibangun sekali per parameter) ---
+_LEVELS = np.arange(256, dtype=np.float64)
+_local = threading.local()
+
+@lru_cache(maxsize=64)
+def _gamma_lut(gamma):
+    """LUT 256 entri untuk Gamma Correction."""
+    inv_gamma = 1.0 / gamma
+    return (((_LEVELS / 255.0) ** inv_gamma) * 255).astype("uint8")
+
+@lru_cache(maxsize=64)
+def _brightness_lut(alpha, beta):
+    """LUT setara cv2.convertScaleAbs: dibangun dengan operasi yang sama pada 256 level."""
+    return cv2.convertScaleAbs(_LEVELS.astype(np.uint8).reshape(1, -1), alpha=alpha, beta=beta).reshape(-1)
+
+@lru_cache(maxsize=64)
+def _saturation_lut(scale):
+    """LUT untuk channel S (HSV), setara clip(s * scale) lalu dipotong ke uint8."""
+    return np.clip(_LEVELS * scale, 0, 255).astype(np.uint8)
+
+def _clahe(clip_limit, tile_grid):
+    """Objek CLAHE di-cache per thread (objek OpenCV tidak dibagi antar thread)."""
+    cache = getattr(_local, "clahe", None)
+    if cache is None:
+        cache = _local.clahe = {}
+    key = (clip_limit, tuple(tile_grid))
+    clahe = cache.get(key)
+    if clahe is None:
+        clahe = cache[key] = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tuple(tile_grid))
+    return clahe
+
+# --- OPERATOR ---
 def apply_he(img: np.ndarray) -> np.ndarray:
     """Histogram Equalization pada channel Y (Luminance)."""
     img_yuv = cv2.cvtColor(img, cv2.COLOR_BGR2YUV)
     img_yuv[:, :, 0] = cv2.equalizeHist(img_yuv[:, :, 0])
     return cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR)
 
-def apply_clahe(img: np.ndarray) -> np.ndarray:
+def apply_clahe(img: np.ndarray, clip_limit=2.0, tile_grid=(8, 8)) -> np.ndarray:
     """Contrast Limited Adaptive Histogram Equalization."""
     lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
     l, a, b = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    cl = clahe.apply(l)
+    cl = _clahe(clip_limit, tile_grid).apply(l)
     merged = cv2.merge((cl, a, b))
     return cv2.cvtColor(merged, cv2.COLOR_LAB2BGR)
 
@@ -21,14 +54,12 @@ def apply_contrast_stretching(img: np.ndarray) -> np.ndarray:
     return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
 
 def apply_brightness(img: np.ndarray, alpha=1.2, beta=30) -> np.ndarray:
-    """Mengatur Brightness (beta) dan Contrast (alpha)."""
-    return cv2.convertScaleAbs(img, alpha=alpha, beta=beta)
+    """Mengatur Brightness (beta) dan Contrast (alpha) lewat LUT uint8."""
+    return cv2.LUT(img, _brightness_lut(float(alpha), float(beta)))
 
 def apply_gamma(img: np.ndarray, gamma=1.5) -> np.ndarray:
     """Gamma Correction."""
-    inv_gamma = 1.0 / gamma
-    table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in np.arange(256)]).astype("uint8")
-    return cv2.LUT(img, table)
+    return cv2.LUT(img, _gamma_lut(float(gamma)))
 
 def apply_unsharp(img: np.ndarray) -> np.ndarray:
     """Unsharp Masking untuk mempertajam tepi."""
@@ -40,37 +71,164 @@ def apply_bilateral(img: np.ndarray) -> np.ndarray:
     return cv2.bilateralFilter(img, d=9, sigmaColor=75, sigmaSpace=75)
 
 def apply_saturation(img: np.ndarray, scale=1.3) -> np.ndarray:
-    """Meningkatkan saturasi warna."""
+    """Meningkatkan saturasi warna (LUT uint8 pada channel S, tanpa konversi float)."""
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
     h, s, v = cv2.split(hsv)
-    s = np.clip(s * scale, 0, 255).astype(np.uint8)
+    s = cv2.LUT(s, _saturation_lut(float(scale)))
     return cv2.cvtColor(cv2.merge([h, s, v]), cv2.COLOR_HSV2BGR)
 
+# Mapping nama metode ke fungsi (dibangun sekali saat import)
+PROCESSORS = {
+    "HE": apply_he,
+    "CLAHE": apply_clahe,
+    "CS": apply_contrast_stretching,
+    "Brightness": apply_brightness,
+    "Gamma": apply_gamma,
+    "Unsharp": apply_unsharp,
+    "Bilateral": apply_bilateral,
+    "Saturation": apply_saturation
+}
+
+# --- PIPELINE (CHAIN) ---
+# Metode pointwise pada BGR: dapat digabung (fused) menjadi satu LUT
+_POINTWISE = {
+    "Gamma": lambda p: _gamma_lut(float(p.get("gamma", 1.5))),
+    "Brightness": lambda p: _brightness_lut(float(p.get("alpha", 1.2)), float(p.get("beta", 30))),
+}
+
+# Metode pada satu channel di ruang warna lain: (BGR->ruang, ruang->BGR, channel, builder op)
+# Op berupa LUT (np.ndarray, bisa digabung) atau fungsi channel -> channel
+_CHANNEL_OPS = {
+    "HE": (cv2.COLOR_BGR2YUV, cv2.COLOR_YUV2BGR, 0, lambda p: cv2.equalizeHist),
+    "CLAHE": (cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR, 0,
+              lambda p: (lambda ch, c=float(p.get("clip_limit", 2.0)), t=tuple(p.get("tile_grid", (8, 8))):
+                         _clahe(c, t).apply(ch))),
+    "Saturation": (cv2.COLOR_BGR2HSV, cv2.COLOR_HSV2BGR, 1, lambda p: _saturation_lut(float(p.get("scale", 1.3)))),
+}
+
+def _apply_channel_op(channel, op):
+    return cv2.LUT(channel, op) if isinstance(op, np.ndarray) else op(channel)
+
+def parse_steps(steps):
+    """
+    Normalisasi definisi chain menjadi tuple ((method, params), ...).
+    Menerima "CLAHE>Gamma>Saturation", list nama metode, atau list (method, {params}).
+    """
+    if steps is None:
+        return ()
+    if isinstance(steps, str):
+        steps = [name.strip() for name in steps.split(">")]
+    normalized = []
+    for step in steps:
+        method, params = (step, {}) if isinstance(step, str) else (step[0], dict(step[1] or {}))
+        if not method or method == "None":
+            continue
+        if method not in PROCESSORS:
+            raise ValueError(f"Unknown enhancement method: {method}")
+        params = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+        normalized.append((method, params))
+    return tuple(normalized)
+
+class EnhancementPipeline:
+    """
+    Chain enhancement berurutan yang dikompilasi sekali:
+    - Langkah pointwise berurutan (Gamma, Brightness) digabung menjadi satu LUT
+    - Langkah berurutan di ruang warna yang sama berbagi satu konversi warna (dan LUT channel digabung)
+    - Langkah lain (CS, Unsharp, Bilateral) dijalankan apa adanya
+    """
+
+    def __init__(self, steps):
+        self.steps = parse_steps(steps)
+        self.kernels = self._compile(self.steps)
+
+    @property
+    def name(self):
+        """Label chain untuk nama folder / file, mis. "CLAHE-Gamma"."""
+        return "-".join(method for method, _ in self.steps) or "None"
+
+    @staticmethod
+    def _compile(steps):
+        kernels = []
+        for method, params in steps:
+            p = dict(params)
+            last = kernels[-1] if kernels else None
+
+            if method in _POINTWISE:
+                lut = _POINTWISE[method](p)
+                if last is not None and last[0] == "lut":
+                    kernels[-1] = ("lut", lut[last[1]])
+                else:
+                    kernels.append(("lut", lut))
+
+            elif method in _CHANNEL_OPS:
+                to_code, from_code, channel, build = _CHANNEL_OPS[method]
+                op = build(p)
+                if last is not None and last[0] == "space" and last[1] == to_code:
+                    ops = last[3]
+                    prev_channel, prev_op = ops[-1]
+                    if prev_channel == channel and isinstance(prev_op, np.ndarray) and isinstance(op, np.ndarray):
+                        ops[-1] = (channel, op[prev_op])
+                    else:
+                        ops.append((channel, op))
+                else:
+                    kernels.append(("space", to_code, from_code, [(channel, op)]))
+
+            else:
+                kernels.append(("func", PROCESSORS[method], p))
+        return kernels
+
+    def __call__(self, img):
+        for kernel in self.kernels:
+            kind = kernel[0]
+            if kind == "lut":
+                img = cv2.LUT(img, kernel[1])
+            elif kind == "space":
+                _, to_code, from_code, ops = kernel
+                channels = list(cv2.split(cv2.cvtColor(img, to_code)))
+                for channel, op in ops:
+                    channels[channel] = _apply_channel_op(channels[channel], op)
+                img = cv2.cvtColor(cv2.merge(channels), from_code)
+            else:
+                _, func, p = kernel
+                img = func(img, **p)
+        return img
+
+@lru_cache(maxsize=128)
+def _compile(steps):
+    pipeline = EnhancementPipeline(steps)
+    return pipeline if pipeline.kernels else None
+
+def get_pipeline(steps):
+    """EnhancementPipeline terkompilasi (di-cache) untuk sebuah chain; None jika chain kosong."""
+    return _compile(parse_steps(steps))
+
+def get_enhancer(method: str, **params):
+    """
+    Mengembalikan fungsi enhancement terkompilasi untuk (method, params).
+    State berparameter (LUT, CLAHE) dibangun sekali lalu dipakai ulang untuk setiap frame.
+    Mengembalikan None jika metode tidak dikenal / "None".
+    """
+    if method not in PROCESSORS:
+        return None
+    return get_pipeline([(method, params)])
+
 # --- FUNGSI UTAMA ---
-def enhance_image(img: np.ndarray, method: str) -> np.ndarray:
+def enhance_image(img: np.ndarray, method, **params) -> np.ndarray:
     """
     Fungsi utama untuk memilih metode perbaikan citra.
-    Menggunakan dictionary dispatch agar lebih rapi daripada if-else panjang.
+    `method` dapat berupa satu nama metode, chain "CLAHE>Gamma", atau list langkah (lihat parse_steps).
+    Pipeline dikompilasi sekali dan di-cache.
     """
     if img is None:
         return None
-        
-    # Mapping nama metode ke fungsi
-    processors = {
-        "HE": apply_he,
-        "CLAHE": apply_clahe,
-        "CS": apply_contrast_stretching,
-        "Brightness": apply_brightness,
-        "Gamma": apply_gamma,
-        "Unsharp": apply_unsharp,
-        "Bilateral": apply_bilateral,
-        "Saturation": apply_saturation
-    }
 
     # Ambil fungsi berdasarkan nama, jika tidak ada/None, kembalikan gambar asli
-    process_func = processors.get(method)
-    
+    if isinstance(method, str) and ">" not in method:
+        process_func = get_enhancer(method, **params)
+    else:
+        process_func = get_pipeline(method)
+
     if process_func:
         return process_func(img)
-    
-    return img
\ No newline at end of file
+
+    return img
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import time
+import uuid
+import cv2
+import numpy as np
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+def _buffer(uploaded_file):
+    """View memori (tanpa copy) dari file upload Streamlit / objek file-like berbasis bytes."""
+    if hasattr(uploaded_file, "getbuffer"):
+        return uploaded_file.getbuffer()
+    return memoryview(uploaded_file.getvalue())
+
+def upload_digest(uploaded_file):
+    """SHA-256 isi file upload (dipakai sebagai kunci cache & nama file)."""
+    return hashlib.sha256(_buffer(uploaded_file)).hexdigest()
+
+def decode_image_upload(uploaded_file, flags=cv2.IMREAD_COLOR):
+    """Decode gambar langsung dari buffer upload dengan cv2.imdecode (tanpa tulis/baca disk)."""
+    data = np.frombuffer(_buffer(uploaded_file), dtype=np.uint8)
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, flags)
+
+def stream_video_upload(uploaded_file, folder="inputs/videos", chunk_size=CHUNK_SIZE):
+    """
+    Tulis video upload ke disk per chunk dengan nama unik berbasis hash konten.
+    File ditulis ke nama sementara unik (aman untuk banyak user sekaligus), lalu di-rename
+    ke `<sha256[:16]><ext>`; upload dengan isi yang sama memakai file yang sudah ada.
+    Mengembalikan (path, digest).
+    """
+    os.makedirs(folder, exist_ok=True)
+    ext = os.path.splitext(getattr(uploaded_file, "name", ""))[1].lower() or ".mp4"
+    tmp_path = os.path.join(folder, f".upload_{uuid.uuid4().hex}.part")
+
+    h = hashlib.sha256()
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in iter(lambda: uploaded_file.read(chunk_size), b""):
+                h.update(chunk)
+                f.write(chunk)
+        digest = h.hexdigest()
+        final_path = os.path.join(folder, f"{digest[:16]}{ext}")
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            os.utime(final_path)  # perpanjang masa retensi
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return final_path, digest
+
+def cleanup_inputs(folder="inputs", max_age_hours=24.0, max_bytes=None, keep=(), keep_recent_hours=1.0):
+    """
+    Kebijakan retensi input sementara: hapus file yang lebih tua dari `max_age_hours`,
+    lalu (opsional) hapus file tertua hingga total ukuran <= `max_bytes`.
+    File di `keep` (mis. input job yang masih antri / berjalan) dan file yang disentuh dalam
+    `keep_recent_hours` terakhir (upload yang baru dipakai ulang sesi lain) tidak pernah dihapus.
+    Mengembalikan jumlah file yang dihapus.
+    """
+    if not os.path.isdir(folder):
+        return 0
+    now = time.time()
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    removed = 0
+    kept = []
+    for mtime, size, path in sorted(entries):
+        protected = os.path.abspath(path) in keep or now - mtime < keep_recent_hours * 3600
+        if max_age_hours is not None and now - mtime > max_age_hours * 3600 and not protected:
+            removed += _remove(path)
+        else:
+            kept.append((mtime, size, path, protected))
+
+    if max_bytes is not None:
+        total = sum(size for _, size, _, _ in kept)
+        for _, size, path, protected in kept:
+            if total <= max_bytes:
+                break
+            if not protected:
+                removed += _remove(path)
+                total -= size
+    return removed
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,237 @@
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Status job: queued -> running -> done / failed / cancelled; job aktif milik server sebelumnya -> interrupted
+ACTIVE_STATES = ("queued", "running")
+RESUMABLE_STATES = ("failed", "cancelled", "interrupted")
+
+class JobCancelled(Exception):
+    """Dilempar dari pengecekan cancel per frame di worker saat job diminta berhenti."""
+
+class JobStore:
+    """
+    State job persisten: satu file `<id>.json` per job di `folder` (ditulis atomik via rename),
+    sehingga UI bisa polling dari sesi / rerun mana pun dan state tetap ada setelah server restart.
+    Permintaan cancel ditandai dengan file `<id>.cancel` terpisah agar worker tidak berebut menulis state.
+    """
+
+    def __init__(self, folder="outputs/jobs"):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, job_id, ext=".json"):
+        return os.path.join(self.folder, f"{job_id}{ext}")
+
+    def load(self, job_id):
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save(self, job):
+        job["updated"] = time.time()
+        tmp_path = self._path(job["id"], f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, indent=2, default=str)
+        os.replace(tmp_path, self._path(job["id"]))
+        return job
+
+    def update(self, job_id, **fields):
+        job = self.load(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        job.update(fields)
+        return self.save(job)
+
+    def list(self):
+        """Semua job, terbaru lebih dulu."""
+        jobs = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".json"):
+                job = self.load(name[:-len(".json")])
+                if job is not None:
+                    jobs.append(job)
+        return sorted(jobs, key=lambda j: j["created"], reverse=True)
+
+    def active_inputs(self):
+        """Path input milik job yang masih antri / berjalan (tidak boleh dihapus oleh retensi input)."""
+        return {job["input"] for job in self.list() if job["status"] in ACTIVE_STATES and job.get("input")}
+
+    def request_cancel(self, job_id):
+        open(self._path(job_id, ".cancel"), "w").close()
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self._path(job_id, ".cancel"))
+
+    def clear_cancel(self, job_id):
+        try:
+            os.remove(self._path(job_id, ".cancel"))
+        except FileNotFoundError:
+            pass
+
+class _JobProgress:
+    """
+    Callback `progress(fraction)` untuk LivePreview di dalam worker: progres ditulis ke JobStore
+    paling sering setiap `min_interval` detik.
+    `check()` dipanggil per frame (`cancel_check`), terpisah dari progres yang hanya dilaporkan bila jumlah
+    frame diketahui; permintaan cancel dicek paling sering setiap `cancel_interval` detik (JobCancelled).
+    """
+
+    def __init__(self, store, job_id, min_interval=1.0, cancel_interval=0.25):
+        self.store = store
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.cancel_interval = cancel_interval
+        self._last = float("-inf")
+        self._last_check = float("-inf")
+
+    def __call__(self, fraction):
+        now = time.perf_counter()
+        if now - self._last >= self.min_interval:
+            self.store.update(self.job_id, progress=round(float(fraction), 4))
+            self._last = now
+
+    def check(self):
+        now = time.perf_counter()
+        if now - self._last_check < self.cancel_interval:
+            return
+        self._last_check = now
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _run_job(job_id, folder):
+    """Dijalankan di worker process: satu model per worker (dimuat ulang hanya jika weights berbeda)."""
+    import batch_runner
+
+    store = JobStore(folder)
+    job = store.load(job_id)
+    if job is None:
+        return "missing"
+    if store.cancel_requested(job_id):
+        store.update(job_id, status="cancelled", finished=_now())
+        return "cancelled"
+
+    store.update(job_id, status="running", started=_now(), finished=None, progress=0.0, error=None, pid=os.getpid())
+    t0 = time.perf_counter()
+    try:
+        batch_runner.load_worker_model(job["model_path"])
+        progress = _JobProgress(store, job_id)
+        record = batch_runner._process_video(job["input"], job["options"], job_id,
+                                             progress=progress, cancel_check=progress.check)
+    except JobCancelled:
+        store.update(job_id, status="cancelled", finished=_now(), elapsed=round(time.perf_counter() - t0, 3))
+        return "cancelled"
+    except Exception as e:
+        store.update(job_id, status="failed", error=str(e), finished=_now(),
+                     elapsed=round(time.perf_counter() - t0, 3))
+        return "failed"
+    store.update(job_id, status="done", progress=1.0, result=record, finished=_now(),
+                 elapsed=round(time.perf_counter() - t0, 3))
+    return "done"
+
+class JobManager:
+    """
+    Antrian job video di latar belakang: job dijalankan di pool process lokal (`workers` = batas
+    konkurensi, satu model per worker) sehingga sesi Streamlit tidak terblokir dan rerun widget tidak
+    mengulang proses dari frame 0. State & progres disimpan di JobStore; output ditulis ke `outputs/`
+    dengan layout yang sama seperti batch_runner.
+    Buat satu instance per server (mis. lewat st.cache_resource): job aktif dari instance sebelumnya
+    ditandai "interrupted" saat start dan bisa dilanjutkan dengan `resume`.
+    """
+
+    def __init__(self, folder="outputs/jobs", workers=1):
+        self.store = JobStore(folder)
+        self.workers = max(1, int(workers))
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"))
+        self._futures = {}
+        self._lock = threading.Lock()
+        for job in self.store.list():
+            if job["status"] in ACTIVE_STATES:
+                self.store.update(job["id"], status="interrupted")
+
+    def submit(self, input_path, model_path, options):
+        """Daftarkan job video (`options` = opsi batch_runner) dan masukkan ke antrian; mengembalikan ID job."""
+        job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.store.save({
+            "id": job_id,
+            "status": "queued",
+            "created": _now(),
+            "started": None,
+            "finished": None,
+            "input": input_path,
+            "model_path": model_path,
+            "options": options,
+            "progress": 0.0,
+            "result": None,
+            "error": None,
+        })
+        self._enqueue(job_id)
+        return job_id
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            future = self._pool.submit(_run_job, job_id, self.store.folder)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+
+    def _finished(self, job_id, future):
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+        if future.cancelled():
+            self.store.update(job_id, status="cancelled", finished=_now())
+        elif future.exception() is not None:
+            # Worker mati (mis. kehabisan memori) sebelum sempat menulis state
+            self.store.update(job_id, status="failed", error=str(future.exception()), finished=_now())
+
+    def get(self, job_id):
+        return self.store.load(job_id)
+
+    def list(self):
+        return self.store.list()
+
+    def cancel(self, job_id):
+        """Batalkan job yang masih antri atau hentikan yang sedang berjalan (di antara frame)."""
+        job = self.store.load(job_id)
+        if job is None or job["status"] not in ACTIVE_STATES:
+            return False
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return True
+        self.store.request_cancel(job_id)
+        return True
+
+    def resume(self, job_id):
+        """Jalankan ulang job yang gagal / dibatalkan / terputus dengan opsi yang sama (dari frame pertama)."""
+        job = self.store.load(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        if job["status"] not in RESUMABLE_STATES:
+            raise ValueError(f"Job {job_id} is {job['status']} and cannot be resumed")
+        if not os.path.exists(job["input"]):
+            raise ValueError(f"Input of job {job_id} no longer exists: {job['input']}")
+        self.store.clear_cancel(job_id)
+        self.store.update(job_id, status="queued", progress=0.0, error=None, result=None,
+                          started=None, finished=None)
+        self._enqueue(job_id)
+        return job_id
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+def job_outputs(job):
+    """File hasil job yang ada di disk (video, record export, trace)."""
+    result = job.get("result") or {}
+    return {key: result[key] for key in ("output", "export", "trace")
+            if isinstance(result.get(key), str) and os.path.exists(result[key])}
@@ -0,0 +1,101 @@
+import numpy as np
+
+def build_class_table(names, class_mapping, labels):
+    """
+    Tabel lookup class-id model -> indeks label tampilan (-1 = kelas diabaikan).
+    Dibangun sekali dari `model.names` sehingga tidak perlu lookup string per box setiap frame.
+    """
+    items = names.items() if isinstance(names, dict) else enumerate(names)
+    items = [(int(cid), str(name).lower()) for cid, name in items]
+    size = max((cid for cid, _ in items), default=-1) + 1
+    table = np.full(size, -1, dtype=np.int32)
+    for cid, name in items:
+        display = class_mapping.get(name)
+        if display is not None:
+            table[cid] = labels.index(display)
+    return table
+
+def lookup_classes(table, classes):
+    """Konversi array class-id ke indeks label secara vektor (class di luar tabel -> -1)."""
+    cls = np.asarray(classes, dtype=np.int64).reshape(-1)
+    out = np.full(cls.shape, -1, dtype=np.int32)
+    ok = (cls >= 0) & (cls < len(table))
+    out[ok] = table[cls[ok]]
+    return out
+
+def box_centroids(xyxy):
+    """Titik tengah (cx, cy) integer untuk array box (N, 4)."""
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    cx = ((xyxy[:, 0] + xyxy[:, 2]) / 2).astype(np.int32)
+    cy = ((xyxy[:, 1] + xyxy[:, 3]) / 2).astype(np.int32)
+    return np.stack([cx, cy], axis=1)
+
+class TrackTable:
+    """
+    State per track ID dalam array NumPy terurut (bukan dict/set yang tumbuh terus):
+    posisi terakhir, frame terakhir terlihat, dan flag per garis/zona (mis. sudah dihitung).
+    ID yang tidak terlihat selama lebih dari `evict_after` frame dibuang.
+    """
+
+    def __init__(self, n_flags=1, evict_after=90):
+        self.n_flags = n_flags
+        self.evict_after = evict_after
+        self.ids = np.empty(0, dtype=np.int64)
+        self.pos = np.empty((0, 2), dtype=np.float32)
+        self.seen = np.empty(0, dtype=np.int64)
+        self.flags = np.zeros((0, n_flags), dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match(self, ids):
+        """Indeks baris untuk setiap ID dan mask apakah ID sudah dikenal."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        idx = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return idx, self.ids[idx] == ids
+
+    def commit(self, ids, pos, frame_idx, idx, found):
+        """Simpan posisi frame ini, tambahkan ID baru, lalu buang ID yang kedaluwarsa."""
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = idx[found]
+        self.pos[rows] = pos[found]
+        self.seen[rows] = frame_idx
+
+        new = ~found
+        if new.any():
+            new_ids, first = np.unique(ids[new], return_index=True)
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.pos = np.concatenate([self.pos, pos[new][first].astype(np.float32)])
+            self.seen = np.concatenate([self.seen, np.full(len(new_ids), frame_idx, dtype=np.int64)])
+            self.flags = np.concatenate([self.flags, np.zeros((len(new_ids), self.n_flags), dtype=bool)])
+            order = np.argsort(self.ids, kind="stable")
+            self._take(order)
+
+        if self.evict_after is not None and len(self.ids):
+            keep = (frame_idx - self.seen) <= self.evict_after
+            if not keep.all():
+                self._take(np.flatnonzero(keep))
+
+    def _take(self, rows):
+        self.ids = self.ids[rows]
+        self.pos = self.pos[rows]
+        self.seen = self.seen[rows]
+        self.flags = self.flags[rows]
+
+class CountResult:
+    """Hasil update satu frame (semua berupa array sejajar dengan box input)."""
+
+    def __init__(self, centroids, valid, crossed_in, crossed_out, line_in=None, line_out=None,
+                 zone_in=None, zone_out=None):
+        self.centroids = centroids
+        self.valid = valid
+        self.crossed_in = crossed_in
+        self.crossed_out = crossed_out
+        # Detail per garis (N, L) bila counter memiliki lebih dari satu garis
+        self.line_in = line_in
+        self.line_out = line_out
+        # Masuk / keluar zona pada frame ini (N, Z)
+        self.zone_in = zone_in
+        self.zone_out = zone_out
@@ -0,0 +1,121 @@
+"""
+Exported / accelerated model backends (ONNX Runtime, OpenVINO) with fallback to PyTorch .pt.
+Exported files follow Ultralytics' naming next to the .pt weights:
+    weights/best_<size>.pt
+    weights/best_<size>.onnx
+    weights/best_<size>_openvino_model/
+"""
+
+import glob
+import os
+import numpy as np
+from detections import Detections, box_iou
+
+BACKENDS = ["pytorch", "onnx", "openvino"]
+
+def weights_path(size, backend="pytorch", weights_dir="weights"):
+    """Expected path of the weights for a model size and backend."""
+    base = os.path.join(weights_dir, f"best_{size}")
+    if backend == "onnx":
+        return f"{base}.onnx"
+    if backend == "openvino":
+        return f"{base}_openvino_model"
+    return f"{base}.pt"
+
+def resolve_weights(size, backend="pytorch", weights_dir="weights"):
+    """
+    Path weights for the requested backend, falling back to the .pt file when the
+    exported model does not exist. Returns (path, backend_used).
+    """
+    if backend != "pytorch":
+        path = weights_path(size, backend, weights_dir)
+        if os.path.exists(path):
+            return path, backend
+    return weights_path(size, "pytorch", weights_dir), "pytorch"
+
+def export_model(size, backend, weights_dir="weights", imgsz=640, half=False, force=False):
+    """
+    Export best_<size>.pt to an optimized format and cache it next to the .pt.
+    ONNX is exported with dynamic batch size so batched video inference keeps working.
+    """
+    from ultralytics import YOLO
+
+    target = weights_path(size, backend, weights_dir)
+    if os.path.exists(target) and not force:
+        return target
+
+    source = weights_path(size, "pytorch", weights_dir)
+    model = YOLO(source)
+    if backend == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    elif backend == "openvino":
+        exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, half=half)
+    else:
+        raise ValueError(f"Unknown export backend: {backend}")
+    return str(exported)
+
+def _reference_images(images):
+    if isinstance(images, str):
+        patterns = [os.path.join(images, f"*{ext}") for ext in (".jpg", ".jpeg", ".png", ".bmp")]
+        images = sorted(p for pattern in patterns for p in glob.glob(pattern))
+    return list(images)
+
+def _match(ref, other, iou_threshold):
+    """Greedy matching per class: (matched, unmatched_ref, unmatched_other, max_conf_diff)."""
+    matched, conf_diff = 0, 0.0
+    used = np.zeros(len(other), dtype=bool)
+    if len(ref) and len(other):
+        iou = box_iou(ref.xyxy, other.xyxy)
+        iou[ref.cls[:, None] != other.cls[None, :]] = 0
+        for i in np.argsort(-ref.conf):
+            candidates = np.where(~used, iou[i], 0)
+            j = int(candidates.argmax())
+            if candidates[j] >= iou_threshold:
+                used[j] = True
+                matched += 1
+                conf_diff = max(conf_diff, abs(float(ref.conf[i]) - float(other.conf[j])))
+    return matched, len(ref) - matched, len(other) - matched, conf_diff
+
+def check_parity(size, backend, images, weights_dir="weights", conf=0.25, iou_threshold=0.5, min_f1=0.95):
+    """
+    Compare detections of an exported backend against the PyTorch model on reference images.
+    Returns a report dict with per-image results and an overall `passed` flag (F1 >= min_f1).
+    """
+    import cv2
+    from ultralytics import YOLO
+
+    ref_model = YOLO(weights_path(size, "pytorch", weights_dir))
+    path, used = resolve_weights(size, backend, weights_dir)
+    if used != backend:
+        raise FileNotFoundError(f"No exported {backend} model for '{size}' (expected {weights_path(size, backend, weights_dir)})")
+    test_model = YOLO(path, task="detect")
+
+    per_image = []
+    totals = {"matched": 0, "missing": 0, "extra": 0}
+    max_conf_diff = 0.0
+    for image_path in _reference_images(images):
+        img = cv2.imread(image_path)
+        if img is None:
+            continue
+        ref = Detections.from_result(ref_model.predict(img, conf=conf, imgsz=640, verbose=False)[0])
+        other = Detections.from_result(test_model.predict(img, conf=conf, imgsz=640, verbose=False)[0])
+        matched, missing, extra, diff = _match(ref, other, iou_threshold)
+        totals["matched"] += matched
+        totals["missing"] += missing
+        totals["extra"] += extra
+        max_conf_diff = max(max_conf_diff, diff)
+        per_image.append({"image": image_path, "reference": len(ref), "backend": len(other),
+                          "matched": matched, "max_conf_diff": round(diff, 4)})
+
+    denom = 2 * totals["matched"] + totals["missing"] + totals["extra"]
+    f1 = 2 * totals["matched"] / denom if denom else 1.0
+    return {
+        "size": size,
+        "backend": backend,
+        "images": len(per_image),
+        **totals,
+        "f1": round(f1, 4),
+        "max_conf_diff": round(max_conf_diff, 4),
+        "passed": bool(per_image) and f1 >= min_f1,
+        "per_image": per_image,
+    }
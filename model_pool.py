@@ -0,0 +1,176 @@
+import gc
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+# Titik nol time-to-first-result: modul ini di-import paling awal oleh app
+PROCESS_START = time.perf_counter()
+
+def load_yolo(model_path):
+    """Muat YOLO; import ultralytics (dan torch) ditunda sampai model benar-benar dibutuhkan."""
+    from ultralytics import YOLO
+    if model_path.endswith(".pt"):
+        return YOLO(model_path)
+    # Model hasil export (ONNX / OpenVINO) butuh hint task
+    return YOLO(model_path, task="detect")
+
+def warmup(model, imgsz=640):
+    """Satu inferensi dummy agar alokasi memori, fuse layer & init backend tidak terjadi di request pertama."""
+    model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+
+def model_bytes(model, model_path):
+    """Perkiraan memori model: ukuran parameter torch, atau ukuran file / folder weights (ONNX, OpenVINO)."""
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.model.parameters()))
+    except (AttributeError, TypeError):
+        pass
+    if os.path.isdir(model_path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, files in os.walk(model_path) for name in files)
+    return os.path.getsize(model_path) if os.path.exists(model_path) else 0
+
+def available_memory():
+    """Memori fisik yang masih tersedia (byte, MemAvailable Linux); None jika tidak diketahui."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+class ModelPool:
+    """
+    Pool model berbatas (mis. nano/small/medium) yang dibagi semua sesi.
+    - `get(path)`: model siap pakai (sudah di-warmup); menunggu preload yang sedang berjalan, atau memuat
+      langsung bila belum pernah dimuat. Pemanggil lain untuk path yang sama menunggu hasil yang sama.
+    - `preload(paths)`: muat + warmup di thread latar belakang, hanya selama masih ada ruang
+    - eviction LRU bila jumlah model > `max_models`, total perkiraan memori model > `max_bytes`,
+      atau memori sistem tersedia < `min_free_bytes`
+    Waktu load, warmup & kesiapan tiap model serta time-to-first-result dicatat di `stats()`.
+    """
+
+    def __init__(self, max_models=3, max_bytes=None, min_free_bytes=512 * 1024 ** 2, loader=load_yolo,
+                 warmup_imgsz=640):
+        self.max_models = max(1, int(max_models))
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.loader = loader
+        self.warmup_imgsz = warmup_imgsz
+        self.created = time.perf_counter()
+        self.first_result_s = None
+        self._models = OrderedDict()
+        self._pending = {}
+        self._evicted = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-preload")
+
+    # --- 1. LOAD & EVICTION ---
+    def _load(self, path):
+        t0 = time.perf_counter()
+        model = self.loader(path)
+        t1 = time.perf_counter()
+        if self.warmup_imgsz:
+            warmup(model, self.warmup_imgsz)
+        t2 = time.perf_counter()
+        entry = {"model": model, "bytes": model_bytes(model, path), "load_s": t1 - t0, "warmup_s": t2 - t1,
+                 "ready_s": t2 - self.created, "hits": 0}
+        with self._lock:
+            self._models[path] = entry
+            self._evict(keep=path)
+        return entry
+
+    def _over_budget(self):
+        if len(self._models) > self.max_models:
+            return True
+        if self.max_bytes is not None and sum(e["bytes"] for e in self._models.values()) > self.max_bytes:
+            return True
+        free = available_memory() if self.min_free_bytes else None
+        return free is not None and free < self.min_free_bytes
+
+    def _evict(self, keep):
+        evicted = False
+        while len(self._models) > 1 and self._over_budget():
+            path = next(p for p in self._models if p != keep)
+            del self._models[path]
+            self._evicted += 1
+            evicted = True
+        if evicted:
+            gc.collect()
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def _has_room(self):
+        if len(self._models) + len(self._pending) >= self.max_models:
+            return False
+        free = available_memory() if self.min_free_bytes else None
+        return free is None or free >= 2 * self.min_free_bytes
+
+    # --- 2. AKSES ---
+    def get(self, path):
+        """Model untuk `path` (dimuat + warmup bila perlu); model ditandai paling baru dipakai."""
+        with self._lock:
+            entry = self._models.get(path)
+            if entry is not None:
+                self._models.move_to_end(path)
+                entry["hits"] += 1
+                return entry["model"]
+            future = self._pending.get(path)
+            owner = future is None
+            if owner:
+                future = self._pending[path] = Future()
+        if owner:
+            try:
+                future.set_result(self._load(path))
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._pending.pop(path, None)
+        entry = future.result()
+        entry["hits"] += 1
+        return entry["model"]
+
+    def preload(self, paths):
+        """Jadwalkan load + warmup di latar belakang (berurutan) untuk path yang ada & belum dimuat."""
+        for path in paths:
+            with self._lock:
+                if path in self._models or path in self._pending or not os.path.exists(path):
+                    continue
+                if not self._has_room():
+                    break
+            self._executor.submit(self._preload_one, path)
+
+    def _preload_one(self, path):
+        try:
+            with self._lock:
+                if path in self._models or path in self._pending or not self._has_room():
+                    return
+            self.get(path)
+        except Exception:
+            pass  # preload bersifat oportunistik; error muncul lagi saat get() dipanggil langsung
+
+    def is_ready(self, path):
+        with self._lock:
+            return path in self._models
+
+    def mark_first_result(self):
+        """Catat time-to-first-result (sejak proses start) saat hasil pertama tampil ke pengguna."""
+        if self.first_result_s is None:
+            self.first_result_s = time.perf_counter() - PROCESS_START
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": {path: {k: v for k, v in e.items() if k != "model"} for path, e in self._models.items()},
+                "loading": list(self._pending),
+                "evicted": self._evicted,
+                "first_result_s": self.first_result_s,
+            }
@@ -0,0 +1,339 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from counting import CLASS_MAPPING, DISPLAY_ORDER, draw_counter_hud
+from detections import Detections
+from zones import ZoneCounter
+from profiling import Profiler
+from tracking import make_tracker, update_tracker
+from video_writer import AsyncVideoWriter, EncodePolicy, CODECS
+
+def parse_source(source):
+    """'0' / '1' -> indeks webcam (int); selain itu path file atau URL (rtsp://, http://) apa adanya."""
+    source = source.strip() if isinstance(source, str) else source
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+class StreamReader:
+    """
+    Thread decode untuk satu sumber (RTSP / webcam / file).
+    Hanya frame terbaru yang disimpan: frame yang belum sempat diambil saat frame baru datang dibuang,
+    sehingga latensi tidak menumpuk saat inferensi lebih lambat dari kamera.
+    File diputar dengan kecepatan FPS aslinya (`realtime`) agar bisa dipakai sebagai pengganti kamera live;
+    sumber jaringan yang terputus dicoba dibuka ulang setiap `reconnect_delay` detik.
+    """
+
+    def __init__(self, name, source, realtime=True, loop=False, reconnect_delay=1.0, wakeup=None):
+        self.name = name
+        self.source = parse_source(source)
+        self.is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        self.realtime = realtime
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+        self.fps = 30.0
+        self.size = None
+
+        self.read_frames = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.error = None
+        self.finished = False
+
+        self._wakeup = wakeup or threading.Event()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"stream-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+
+    def latest(self):
+        """Ambil (seq, frame, t_capture) terbaru yang belum diproses, atau None."""
+        with self._lock:
+            item, self._latest = self._latest, None
+        return item
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        if cap.isOpened():
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or self.fps
+        return cap
+
+    def _run(self):
+        cap = self._open()
+        try:
+            if not cap.isOpened() and self.is_file:
+                raise IOError(f"cannot open {self.source}")
+            interval = 1.0 / self.fps if self.fps > 0 else 0.0
+            next_t = time.perf_counter()
+            while not self._stop.is_set():
+                ret, frame = cap.read() if cap.isOpened() else (False, None)
+                if not ret:
+                    if self.is_file and self.loop and self.read_frames:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    if self.is_file:
+                        break
+                    # Sumber live terputus: buka ulang
+                    cap.release()
+                    if self._stop.wait(self.reconnect_delay):
+                        break
+                    cap = self._open()
+                    self.reconnects += 1
+                    continue
+
+                self.read_frames += 1
+                self.size = (frame.shape[1], frame.shape[0])
+                with self._lock:
+                    if self._latest is not None:
+                        self.dropped += 1
+                    self._latest = (self.read_frames, frame, time.perf_counter())
+                self._wakeup.set()
+
+                if self.realtime and self.is_file and interval:
+                    next_t += interval
+                    delay = next_t - time.perf_counter()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    else:
+                        next_t = time.perf_counter()
+        except Exception as e:
+            self.error = e
+        finally:
+            cap.release()
+            self.finished = True
+            self._wakeup.set()
+
+class _StreamState:
+    """State per stream: reader, tracker, counter, writer & statistik."""
+
+    def __init__(self, reader, counter):
+        self.reader = reader
+        self.counter = counter
+        self.tracker = None
+        self.writer = None
+        self.output = None
+        self.processed = 0
+        self.stale = 0
+        self.latency_ms = []
+
+class MultiStreamCounter:
+    """
+    Penghitungan kendaraan dari beberapa sumber live sekaligus.
+    - satu thread decode per sumber (StreamReader, hanya frame terbaru yang dipertahankan)
+    - satu loop inferensi bersama: frame terbaru dari semua stream di-enhance lalu di-`predict`
+      dalam satu batch (maks. `max_batch`), frame yang lebih tua dari `max_latency` detik dibuang
+    - tracker (ByteTrack) & ZoneCounter terpisah per stream
+    - video anotasi per stream (jika `output_dir`) ditulis oleh AsyncVideoWriter sesuai `encode` (EncodePolicy)
+    Loop berjalan di thread pemanggil (aman untuk pemanggilan Streamlit di `on_frame`).
+    """
+
+    def __init__(self, sources, model, enhance_image=None, enhance_type="None", confidence=0.25,
+                 zone_config=None, max_batch=8, max_latency=0.5, evict_after=90,
+                 realtime=True, loop=False, output_dir=None, profiler=None, encode=None):
+        self.model = model
+        self.enhance_image = enhance_image
+        self.enhance_type = enhance_type
+        self.confidence = confidence
+        self.max_batch = max(1, int(max_batch))
+        self.max_latency = max_latency
+        self.output_dir = output_dir
+        self.encode = encode
+        self.profiler = profiler or Profiler()
+        self._wakeup = threading.Event()
+
+        if isinstance(sources, dict):
+            sources = list(sources.items())
+        else:
+            sources = [(f"cam{i + 1}", s) for i, s in enumerate(sources)]
+        self.streams = [
+            _StreamState(
+                StreamReader(name, src, realtime=realtime, loop=loop, wakeup=self._wakeup),
+                ZoneCounter(model.names, CLASS_MAPPING, DISPLAY_ORDER, config=zone_config, evict_after=evict_after),
+            )
+            for name, src in sources
+        ]
+        self._cursor = 0
+
+    # --- 1. PENGUMPULAN FRAME ---
+    def _collect(self):
+        """Frame terbaru dari tiap stream (round-robin, maks. max_batch); frame basi dibuang."""
+        batch = []
+        n = len(self.streams)
+        now = time.perf_counter()
+        for k in range(n):
+            state = self.streams[(self._cursor + k) % n]
+            item = state.reader.latest()
+            if item is None:
+                continue
+            _, frame, t_capture = item
+            if self.max_latency and now - t_capture > self.max_latency:
+                state.stale += 1
+                continue
+            batch.append((state, frame, t_capture))
+            if len(batch) >= self.max_batch:
+                break
+        self._cursor = (self._cursor + 1) % max(n, 1)
+        return batch
+
+    # --- 2. PEMROSESAN PER STREAM ---
+    def _process(self, state, frame, res, t_capture):
+        state.processed += 1
+        if state.tracker is None:
+            state.tracker = make_tracker(state.reader.fps)
+
+        with self.profiler.span("tracking"):
+            dets = update_tracker(state.tracker, Detections.from_result(res), frame)
+
+        with self.profiler.span("counting"):
+            height, width = frame.shape[:2]
+            counter = state.counter
+            counter.resolve(width, height)
+            result = counter.update(dets.ids, dets.xyxy, dets.cls, state.processed)
+
+        with self.profiler.span("plot"):
+            annotated = dets.plot(frame)
+            for cx, cy in result.centroids[result.valid]:
+                cv2.circle(annotated, (int(cx), int(cy)), 6, (0, 255, 0), -1)
+            counter.draw(annotated, result)
+
+        with self.profiler.span("hud"):
+            draw_counter_hud(annotated, counter)
+
+        if self.output_dir:
+            with self.profiler.span("write"):
+                if state.writer is None:
+                    os.makedirs(self.output_dir, exist_ok=True)
+                    state.output = os.path.join(self.output_dir, f"{state.reader.name}_{time.strftime('%Y%m%d_%H%M%S')}.mp4")
+                    state.writer = AsyncVideoWriter(state.output, state.reader.fps, (width, height), self.encode,
+                                                    profiler=self.profiler)
+                state.writer.write(annotated)
+
+        state.latency_ms.append(1000.0 * (time.perf_counter() - t_capture))
+        if len(state.latency_ms) > 1000:
+            del state.latency_ms[:500]
+        return annotated
+
+    # --- 3. EKSEKUSI ---
+    def run(self, on_frame=None, duration=None, stop_event=None):
+        """
+        Jalankan hingga semua sumber habis, `duration` detik berlalu, atau `stop_event` di-set.
+        `on_frame(name, annotated)` dipanggil untuk setiap frame yang diproses.
+        """
+        for state in self.streams:
+            state.reader.start()
+        start = time.perf_counter()
+        try:
+            while not (stop_event is not None and stop_event.is_set()):
+                if duration and time.perf_counter() - start >= duration:
+                    break
+                self._wakeup.clear()
+                batch = self._collect()
+                if not batch:
+                    if all(s.reader.finished for s in self.streams):
+                        break
+                    self._wakeup.wait(0.05)
+                    continue
+
+                with self.profiler.span("enhance", len(batch)):
+                    frames = [self.enhance_image(f, self.enhance_type) if self.enhance_image else f
+                              for _, f, _ in batch]
+
+                # Satu panggilan predict untuk frame dari semua stream
+                t0 = time.perf_counter()
+                results = self.model.predict(source=frames, conf=self.confidence, imgsz=640, verbose=False)
+                self.profiler.record("inference", t0, time.perf_counter(), len(frames))
+
+                for (state, _, t_capture), frame, res in zip(batch, frames, results):
+                    annotated = self._process(state, frame, res, t_capture)
+                    if on_frame is not None:
+                        on_frame(state.reader.name, annotated)
+        finally:
+            for state in self.streams:
+                state.reader.stop()
+                if state.writer is not None:
+                    state.writer.release()
+
+        errors = [f"{s.reader.name}: {s.reader.error}" for s in self.streams if s.reader.error]
+        if errors and all(s.processed == 0 for s in self.streams):
+            raise IOError("; ".join(errors))
+        return self.stats(time.perf_counter() - start)
+
+    def stats(self, elapsed):
+        """Statistik per stream (frame dibaca / diproses / dibuang, latensi, hitungan) + profil stage."""
+        streams = {}
+        for s in self.streams:
+            lat = np.asarray(s.latency_ms, dtype=np.float64)
+            streams[s.reader.name] = {
+                "source": str(s.reader.source),
+                "read": s.reader.read_frames,
+                "processed": s.processed,
+                "dropped": s.reader.dropped + s.stale,
+                "reconnects": s.reader.reconnects,
+                "fps": s.processed / elapsed if elapsed > 0 else 0.0,
+                "latency_p50_ms": float(np.percentile(lat, 50)) if lat.size else 0.0,
+                "latency_p90_ms": float(np.percentile(lat, 90)) if lat.size else 0.0,
+                "output": s.output,
+                "error": str(s.reader.error) if s.reader.error else None,
+                "counts": s.counter.counts,
+                "lines": s.counter.line_counts,
+                "zones": s.counter.zone_counts,
+            }
+        return {"seconds": elapsed, "streams": streams, "profile": self.profiler.summary(),
+                "bottleneck": self.profiler.bottleneck()}
+
+def main():
+    """
+    Jalankan penghitungan multi-stream tanpa UI, mis. untuk uji lokal:
+        python multistream.py cam1.mp4 cam2.mp4 --duration 30
+        python multistream.py rtsp://localhost:8554/cam1 0 --output-dir outputs/videos/nano/Live
+    File lokal diputar real-time sebagai pengganti kamera; server RTSP lokal bisa dibuat dengan
+    mediamtx + `ffmpeg -re -stream_loop -1 -i clip.mp4 -c copy -f rtsp rtsp://localhost:8554/cam1`.
+    """
+    import argparse
+    import json
+    from image_enhancement import enhance_image, get_pipeline
+    from model_backends import resolve_weights
+    from model_pool import load_yolo
+
+    parser = argparse.ArgumentParser(description="Count vehicles from several live sources at once.")
+    parser.add_argument("sources", nargs="+", help="RTSP/HTTP URLs, webcam indices or video files")
+    parser.add_argument("--model-size", choices=["nano", "small", "medium"], default="nano")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch")
+    parser.add_argument("--enhance", default="None", help='Enhancement chain, e.g. "CLAHE>Gamma"')
+    parser.add_argument("--zones", help="Counting lines/zones JSON file")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--max-batch", type=int, default=8, help="Max frames per shared predict call")
+    parser.add_argument("--max-latency", type=float, default=0.5, help="Drop frames older than this (seconds)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--loop", action="store_true", help="Loop file sources")
+    parser.add_argument("--output-dir", help="Write annotated video per stream")
+    parser.add_argument("--codec", choices=list(CODECS), default="auto", help="Output codec (ffmpeg when available)")
+    parser.add_argument("--out-width", type=int, help="Downscale written videos to this width")
+    parser.add_argument("--out-every", type=int, default=1, help="Write only every k-th processed frame")
+    args = parser.parse_args()
+
+    get_pipeline(args.enhance)  # validasi chain lebih awal
+    path, _ = resolve_weights(args.model_size, args.backend)
+    model = load_yolo(path)
+    runner = MultiStreamCounter(args.sources, model, enhance_image, args.enhance, args.conf,
+                                zone_config=args.zones, max_batch=args.max_batch, max_latency=args.max_latency,
+                                loop=args.loop, output_dir=args.output_dir,
+                                encode=EncodePolicy(args.codec, args.out_width, args.out_every))
+    try:
+        stats = runner.run(duration=args.duration)
+    except KeyboardInterrupt:
+        return
+    print(json.dumps(stats, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
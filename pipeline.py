@@ -0,0 +1,204 @@
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# Penanda akhir stream yang dialirkan ke setiap stage
+_END = object()
+
+class Stage:
+    """
+    Satu tahap pipeline: fungsi yang dijalankan di thread sendiri.
+    Jika `batch_size` diisi, `func` menerima list berisi hingga `batch_size` item dan harus
+    mengembalikan list hasil dengan urutan yang sama.
+    """
+
+    def __init__(self, name, func, batch_size=None):
+        self.name = name
+        self.func = func
+        self.batched = batch_size is not None
+        self.batch_size = max(1, int(batch_size)) if self.batched else 1
+
+class FramePipeline:
+    """
+    Pipeline multi-thread: source (decode) -> stage 1 -> ... -> stage N -> sink.
+    Setiap stage berjalan di satu thread dan dihubungkan dengan queue berbatas (bounded),
+    sehingga decode, inferensi, anotasi, dan encode bisa berjalan tumpang tindih.
+    Karena tiap stage hanya punya satu thread dan queue bersifat FIFO, urutan frame tetap terjaga.
+    Sink dijalankan di thread pemanggil (aman untuk pemanggilan Streamlit).
+    Jika `profiler` (profiling.Profiler) diberikan, setiap stage juga dicatat ke sana.
+    """
+
+    def __init__(self, source, stages, queue_size=4, max_samples=4096, profiler=None):
+        self.source = source
+        self.profiler = profiler
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+
+        names = ["decode"] + [s.name for s in self.stages] + ["sink"]
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self._queue_names = [f"{a}->{b}" for a, b in zip(names[:-1], names[1:])]
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+        self._timings = {name: {"items": 0, "seconds": 0.0} for name in names}
+        # Sampel latensi terakhir per stage (ms per item) untuk persentil
+        self._samples = {name: deque(maxlen=max_samples) for name in names}
+        self._depths = {name: {"max": 0, "sum": 0, "samples": 0} for name in self._queue_names}
+
+    # --- 1. UTILITAS INTERNAL ---
+    def _record(self, name, start, items=1):
+        end = time.perf_counter()
+        seconds = end - start
+        if self.profiler is not None:
+            self.profiler.record(name, start, end, items)
+        with self._lock:
+            t = self._timings[name]
+            t["items"] += items
+            t["seconds"] += seconds
+            self._samples[name].append(1000.0 * seconds / max(items, 1))
+
+    def _put(self, idx, item):
+        q = self._queues[idx]
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            depth = q.qsize()
+            with self._lock:
+                d = self._depths[self._queue_names[idx]]
+                d["max"] = max(d["max"], depth)
+                d["sum"] += depth
+                d["samples"] += 1
+            return True
+        return False
+
+    def _get(self, idx):
+        q = self._queues[idx]
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, exc):
+        with self._lock:
+            if self._error is None:
+                self._error = exc
+        self._stop.set()
+
+    def _drain(self):
+        for q in self._queues:
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
+
+    # --- 2. WORKER THREADS ---
+    def _source_worker(self):
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                item = self.source()
+                if item is None:
+                    break
+                self._record("decode", t0)
+                if not self._put(0, item):
+                    return
+        except Exception as e:
+            self._fail(e)
+        self._put(0, _END)
+
+    def _stage_worker(self, idx):
+        stage = self.stages[idx]
+        try:
+            finished = False
+            while not finished:
+                batch = []
+                while len(batch) < stage.batch_size:
+                    item = self._get(idx)
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+
+                if not batch:
+                    break
+
+                t0 = time.perf_counter()
+                if stage.batched:
+                    outputs = stage.func(batch)
+                else:
+                    outputs = [stage.func(batch[0])]
+                self._record(stage.name, t0, len(batch))
+
+                for out in outputs:
+                    if not self._put(idx + 1, out):
+                        return
+        except Exception as e:
+            self._fail(e)
+        self._put(idx + 1, _END)
+
+    # --- 3. EKSEKUSI ---
+    def run(self, sink=None):
+        """Menjalankan pipeline hingga source habis; `sink(item)` dipanggil per frame sesuai urutan."""
+        threads = [threading.Thread(target=self._source_worker, name="decode", daemon=True)]
+        threads += [threading.Thread(target=self._stage_worker, args=(i,), name=stage.name, daemon=True)
+                    for i, stage in enumerate(self.stages)]
+        for t in threads:
+            t.start()
+
+        try:
+            while True:
+                item = self._get(len(self.stages))
+                if item is _END:
+                    break
+                t0 = time.perf_counter()
+                if sink is not None:
+                    sink(item)
+                self._record("sink", t0)
+        finally:
+            # Hentikan thread lain jika sink gagal / dihentikan (mis. rerun Streamlit). Stage mengecek
+            # `_stop` di antara item, jadi join ditunggu sampai panggilan yang sedang berjalan (predict,
+            # writer.write) selesai: setelah run() kembali tidak ada thread yang masih memakai cap / writer.
+            self._stop.set()
+            self._drain()
+            for t in threads:
+                t.join()
+
+        if self._error is not None:
+            raise self._error
+        return self.stats()
+
+    def queue_depths(self):
+        """Kedalaman queue saat ini (jumlah item yang menunggu di antara stage)."""
+        return {name: q.qsize() for name, q in zip(self._queue_names, self._queues)}
+
+    def stats(self):
+        """Waktu per stage (total, rata-rata & persentil ms/frame) serta statistik kedalaman queue."""
+        with self._lock:
+            stages = {}
+            for name, t in self._timings.items():
+                samples = np.asarray(self._samples[name], dtype=np.float64)
+                p50, p90, p99 = np.percentile(samples, [50, 90, 99]) if samples.size else (0.0, 0.0, 0.0)
+                stages[name] = {
+                    "items": t["items"],
+                    "seconds": t["seconds"],
+                    "avg_ms": 1000.0 * t["seconds"] / t["items"] if t["items"] else 0.0,
+                    "p50_ms": float(p50),
+                    "p90_ms": float(p90),
+                    "p99_ms": float(p99),
+                }
+            queues = {
+                name: {
+                    "max": d["max"],
+                    "avg": d["sum"] / d["samples"] if d["samples"] else 0.0,
+                }
+                for name, d in self._depths.items()
+            }
+        return {"stages": stages, "queues": queues}
@@ -0,0 +1,116 @@
+import time
+import cv2
+
+class PreviewPolicy:
+    """
+    Kebijakan live preview untuk mode video.
+    - `enabled`: matikan preview sepenuhnya (writer tetap menerima setiap frame resolusi penuh)
+    - `max_fps`: target FPS preview ke browser
+    - `max_width`: lebar maksimum frame preview (frame diperkecil sebelum dikirim ke Streamlit)
+    - `progress_hz`: batas frekuensi update progress bar
+    - `metrics_hz`: batas frekuensi update panel metrik per stage
+    """
+
+    def __init__(self, enabled=True, max_fps=5.0, max_width=640, progress_hz=4.0, metrics_hz=1.0):
+        self.enabled = enabled
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.progress_hz = progress_hz
+        self.metrics_hz = metrics_hz
+
+class LivePreview:
+    """
+    Membungkus `stframe` & `progress` dengan throttling sesuai PreviewPolicy.
+    Keduanya opsional (None = tidak dipakai, mis. saat berjalan headless) dan bisa berupa
+    objek Streamlit (`.image` / `.progress`) atau callback biasa:
+    `stframe(rgb_frame)` dan `progress(fraction)`.
+    Dengan `profiler` (profiling.Profiler), konversi preview dicatat sebagai stage "preview" dan
+    statistik bergulir dikirim ke `metrics` (placeholder Streamlit `.table` atau `metrics(summary)`).
+    """
+
+    def __init__(self, stframe, progress, total_frames, policy=None, profiler=None, metrics=None):
+        self.stframe = stframe
+        self.progress = progress
+        self.total_frames = total_frames
+        self.policy = policy or PreviewPolicy()
+        if stframe is None:
+            self.policy = PreviewPolicy(enabled=False, progress_hz=self.policy.progress_hz,
+                                        metrics_hz=self.policy.metrics_hz)
+        self.profiler = profiler
+        self.metrics = metrics if profiler is not None else None
+        self._last_frame_t = float("-inf")
+        self._last_progress_t = float("-inf")
+        self._last_metrics_t = float("-inf")
+        self._last_frame = None
+
+    @staticmethod
+    def _interval(rate):
+        return 1.0 / rate if rate and rate > 0 else 0.0
+
+    def _render(self, annotated):
+        if self.profiler is None:
+            return self._convert_and_show(annotated)
+        with self.profiler.span("preview"):
+            self._convert_and_show(annotated)
+
+    def _convert_and_show(self, annotated):
+        # Downscale dulu agar cvtColor & serialisasi ke browser lebih ringan
+        h, w = annotated.shape[:2]
+        max_w = self.policy.max_width
+        if max_w and w > max_w:
+            new_h = max(1, int(round(h * max_w / w)))
+            annotated = cv2.resize(annotated, (max_w, new_h), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
+        if hasattr(self.stframe, "image"):
+            self.stframe.image(rgb, use_container_width=True)
+        else:
+            self.stframe(rgb)
+
+    def _report(self, frame_idx):
+        if self.progress is None or self.total_frames <= 0:
+            return
+        value = min(frame_idx / self.total_frames, 1.0)
+        if hasattr(self.progress, "progress"):
+            self.progress.progress(value)
+        else:
+            self.progress(value)
+
+    def _publish(self):
+        if self.metrics is None:
+            return
+        summary = self.profiler.summary()
+        if hasattr(self.metrics, "table"):
+            self.metrics.table({
+                name: {"ms/frame": round(s["avg_ms"], 2), "p90 ms": round(s["p90_ms"], 2),
+                       "max FPS": round(s["max_fps"], 1)}
+                for name, s in summary.items()
+            })
+        else:
+            self.metrics(summary)
+
+    def update(self, frame_idx, annotated):
+        """Dipanggil untuk setiap frame; hanya merender bila interval preview/progress sudah lewat."""
+        now = time.perf_counter()
+
+        if self.policy.enabled:
+            self._last_frame = annotated
+            if now - self._last_frame_t >= self._interval(self.policy.max_fps):
+                self._render(annotated)
+                self._last_frame_t = now
+                self._last_frame = None
+
+        if now - self._last_progress_t >= self._interval(self.policy.progress_hz):
+            self._report(frame_idx)
+            self._last_progress_t = now
+
+        if self.metrics is not None and now - self._last_metrics_t >= self._interval(self.policy.metrics_hz):
+            self._publish()
+            self._last_metrics_t = now
+
+    def finish(self, frame_idx):
+        """Tampilkan frame terakhir yang sempat di-skip dan progress akhir."""
+        if self.policy.enabled and self._last_frame is not None:
+            self._render(self._last_frame)
+            self._last_frame = None
+        self._report(frame_idx)
+        self._publish()
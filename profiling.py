@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+class Profiler:
+    """
+    Instrumentasi per stage untuk loop video (decode, enhancement, inferensi, plot/HUD,
+    konversi preview, encode).
+    - statistik bergulir (rolling) atas `window` sampel terakhir per stage
+    - opsional: rekam setiap span sebagai event trace (format Chrome Trace / Perfetto)
+    Aman dipanggil dari banyak thread pipeline sekaligus.
+    """
+
+    def __init__(self, window=300, trace=False, max_events=500_000):
+        self.window = window
+        self.trace = trace
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._events = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+        self._composite = set()
+
+    def record(self, name, start, end, items=1):
+        """Catat satu span (`start`/`end` dari time.perf_counter()) yang memproses `items` frame."""
+        ms = 1000.0 * (end - start) / max(items, 1)
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            samples.append(ms)
+            self._counts[name] += items
+            if self.trace:
+                self._events.append((name, start, end, threading.get_ident(), threading.current_thread().name, items))
+
+    @contextmanager
+    def span(self, name, items=1):
+        """`with profiler.span("plot"): ...` — mencatat durasi blok."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), items)
+
+    def summary(self):
+        """Statistik bergulir per stage: jumlah frame, rata-rata & persentil ms/frame, FPS maksimum stage."""
+        with self._lock:
+            snapshot = {name: (np.asarray(s, dtype=np.float64), self._counts[name])
+                        for name, s in self._samples.items()}
+        stats = {}
+        for name, (samples, count) in snapshot.items():
+            if not samples.size:
+                continue
+            avg = float(samples.mean())
+            p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+            stats[name] = {
+                "frames": count,
+                "avg_ms": avg,
+                "p50_ms": float(p50),
+                "p90_ms": float(p90),
+                "p99_ms": float(p99),
+                "max_fps": 1000.0 / avg if avg > 0 else 0.0,
+            }
+        return stats
+
+    def composite(self, *names):
+        """Tandai stage induk yang waktunya sudah dipecah ke sub-span (mis. annotate -> plot/hud/export)."""
+        with self._lock:
+            self._composite.update(names)
+
+    def bottleneck(self, exclude=("sink",)):
+        """
+        Nama stage dengan rata-rata ms/frame terbesar (stage pembatas throughput).
+        Stage composite tidak ikut dibandingkan karena tumpang tindih dengan sub-span-nya sendiri.
+        """
+        with self._lock:
+            skip = set(exclude) | self._composite
+        stats = {k: v for k, v in self.summary().items() if k not in skip}
+        if not stats:
+            return None
+        return max(stats, key=lambda name: stats[name]["avg_ms"])
+
+    def trace_events(self):
+        """Event trace dalam format Chrome Trace Event (dibuka di chrome://tracing atau ui.perfetto.dev)."""
+        with self._lock:
+            events = list(self._events)
+        pid = os.getpid()
+        out, threads = [], {}
+        for name, start, end, tid, thread_name, items in events:
+            threads.setdefault(tid, thread_name)
+            out.append({
+                "name": name, "cat": "stage", "ph": "X", "pid": pid, "tid": tid,
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "args": {"frames": items},
+            })
+        out += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+                for tid, thread_name in threads.items()]
+        return out
+
+    def export_trace(self, path):
+        """Tulis trace + ringkasan statistik ke file JSON; mengembalikan path."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms",
+                       "summary": self.summary()}, f)
+        return path
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+import numpy as np
+from detections import Detections
+
+# Deteksi disimpan dengan threshold serendah ini agar confidence bisa diubah tanpa inferensi ulang
+CACHE_MIN_CONF = 0.05
+
+_weights_digests = {}
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 isi file (di-memo per path + ukuran + mtime agar weights tidak di-hash ulang)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _weights_digests.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        digest = _weights_digests[memo_key] = h.hexdigest()
+    return digest
+
+def weights_digest(path):
+    """Hash weights: isi file, atau gabungan hash semua file di folder model export (mis. OpenVINO)."""
+    if os.path.isfile(path):
+        return file_digest(path)
+    if not os.path.isdir(path):
+        return path
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            h.update(os.path.relpath(full, path).encode("utf-8"))
+            h.update(file_digest(full).encode("ascii"))
+    return h.hexdigest()
+
+def make_key(input_digest, weights_path, enhancement, **params):
+    """
+    Kunci cache: hash konten input + hash weights + enhancement + parameter inferensi.
+    `enhancement` berupa representasi chain yang sudah dinormalisasi (mis. parse_steps()).
+    """
+    payload = json.dumps({
+        "input": input_digest,
+        "weights": weights_digest(weights_path),
+        "enhancement": repr(enhancement),
+        "params": sorted(params.items()),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    Cache hasil deteksi mentah di disk (satu file .npz per kunci) dengan eviksi LRU
+    berbasis ukuran total. Waktu akses disimpan di mtime file.
+    Total ukuran dihitung sekali lalu dijaga berjalan di `put`; folder hanya dipindai ulang saat
+    budget terlampaui, dan eviksi turun sampai `low_water` x `max_bytes` agar tidak terulang tiap put.
+    """
+
+    def __init__(self, root="cache/results", max_bytes=256 * 1024 * 1024, low_water=0.9):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        os.makedirs(root, exist_ok=True)
+        self._bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key, confidence):
+        """
+        Detections yang sudah difilter ke `confidence`, atau None jika tidak ada /
+        tersimpan dengan threshold lebih tinggi dari yang diminta.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if float(data["min_conf"]) > confidence + 1e-6:
+                    return None
+                names = json.loads(str(data["names"]))
+                dets = Detections(data["xyxy"], data["conf"], data["cls"],
+                                  names={int(k): v for k, v in names.items()})
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)  # tandai sebagai baru diakses (LRU)
+        except OSError:
+            pass
+        return dets.filter(confidence)
+
+    def put(self, key, dets, min_conf):
+        """Simpan deteksi mentah (threshold `min_conf`); eviksi hanya bila total melewati max_bytes."""
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        names = dets.names if isinstance(dets.names, dict) else dict(enumerate(dets.names or []))
+        with open(tmp, "wb") as f:
+            np.savez(f, xyxy=dets.xyxy, conf=dets.conf, cls=dets.cls, min_conf=np.float64(min_conf),
+                     names=json.dumps({str(k): v for k, v in names.items()}))
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan()[1]
+            try:
+                old_size = os.path.getsize(path)  # kunci yang sama ditimpa
+            except OSError:
+                old_size = 0
+            try:
+                size = os.path.getsize(tmp)
+                os.replace(tmp, path)
+            except FileNotFoundError:
+                return  # kalah balapan dengan penulis / pembersih lain: entri cukup dilewati
+            self._bytes += size - old_size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self):
+        """Hapus entri yang paling lama tidak diakses hingga total ukuran <= low_water x max_bytes."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries, total = self._scan()
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * self.low_water:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self._bytes = total
@@ -1,10 +1,19 @@
 """
 Helper script to download or setup YOLOv11 models
-This script helps you download pretrained YOLOv11 models from Ultralytics
+This script helps you download pretrained YOLOv11 models from Ultralytics,
+export them to optimized CPU formats (ONNX / OpenVINO) and verify the exports.
+
+Examples:
+    python setup_models.py
+    python setup_models.py --export onnx openvino --half
+    python setup_models.py --export onnx --parity data/reference_images
 """
 
 from ultralytics import YOLO
+import argparse
+import json
 import os
+from model_backends import export_model, check_parity
 
 def download_yolo_models():
     """Download YOLOv11 pretrained models and save them with proper naming"""
@@ -49,5 +58,53 @@ def download_yolo_models():
     print("\nNote: These are pretrained COCO models.")
     print("For custom detection, train your own model and replace these files.")
 
+def export_models(backends, half=False, force=False, sizes=("nano", "small", "medium")):
+    """Export every available best_<size>.pt to the requested optimized formats"""
+    for size in sizes:
+        if not os.path.exists(os.path.join("weights", f"best_{size}.pt")):
+            print(f"✗ Skipping {size.upper()}: weights/best_{size}.pt not found")
+            continue
+        for backend in backends:
+            try:
+                print(f"\n→ Exporting {size.upper()} model to {backend}...")
+                path = export_model(size, backend, half=half, force=force)
+                print(f"✓ Cached at: {path}")
+            except Exception as e:
+                print(f"✗ Error exporting {size} model to {backend}: {e}")
+
+def verify_exports(backends, reference_dir, sizes=("nano", "small", "medium")):
+    """Check that exported models give matching detections on a reference image set"""
+    ok = True
+    for size in sizes:
+        for backend in backends:
+            try:
+                report = check_parity(size, backend, reference_dir)
+            except FileNotFoundError as e:
+                print(f"- {e}")
+                continue
+            status = "✓" if report["passed"] else "✗"
+            ok &= report["passed"]
+            print(f"{status} {size.upper()} {backend}: F1={report['f1']:.3f} over {report['images']} image(s), "
+                  f"max conf diff {report['max_conf_diff']:.3f}")
+            report_path = os.path.join("weights", f"parity_{size}_{backend}.json")
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
+    return ok
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download, export and verify YOLOv11 models.")
+    parser.add_argument("--export", nargs="+", choices=["onnx", "openvino"], default=[],
+                        help="Export formats to build and cache next to the .pt weights")
+    parser.add_argument("--half", action="store_true", help="FP16 precision for OpenVINO exports")
+    parser.add_argument("--force", action="store_true", help="Re-export even if a cached export exists")
+    parser.add_argument("--parity", metavar="IMAGE_DIR",
+                        help="Compare exported models against .pt on the images in this folder")
+    args = parser.parse_args()
+
     download_yolo_models()
+    if args.export:
+        export_models(args.export, half=args.half, force=args.force)
+    if args.parity:
+        backends = args.export or ["onnx", "openvino"]
+        if not verify_exports(backends, args.parity):
+            raise SystemExit(1)
@@ -0,0 +1,79 @@
+import numpy as np
+from detections import Detections
+
+class StridePolicy:
+    """
+    Menentukan frame mana yang menjalankan model (keyframe).
+    - `stride`: model dijalankan setiap k frame (1 = setiap frame)
+    - `adaptive`: stride diturunkan saat gerakan / jumlah deteksi naik, dan dinaikkan
+      perlahan (hingga `stride`) saat adegan tenang
+    """
+
+    def __init__(self, stride=1, adaptive=False, min_stride=1, motion_high=0.02, detections_high=15):
+        self.max_stride = max(1, int(stride))
+        self.min_stride = max(1, min(int(min_stride), self.max_stride))
+        self.adaptive = adaptive
+        self.motion_high = motion_high
+        self.detections_high = detections_high
+        self.current = self.max_stride
+        self._since_key = None
+
+    def is_keyframe(self):
+        """Dipanggil sekali per frame secara berurutan; True jika frame ini harus diinferensi."""
+        if self._since_key is None or self._since_key + 1 >= self.current:
+            self._since_key = 0
+            return True
+        self._since_key += 1
+        return False
+
+    def observe(self, n_detections, motion=0.0):
+        """
+        Umpan balik setelah keyframe: `motion` = rata-rata perpindahan centroid per frame
+        relatif terhadap diagonal frame.
+        """
+        if not self.adaptive:
+            return
+        if motion > self.motion_high or n_detections > self.detections_high:
+            self.current = max(self.min_stride, self.current // 2)
+        elif motion < self.motion_high / 2 and n_detections <= self.detections_high // 2:
+            self.current = min(self.max_stride, self.current + 1)
+
+class TrackExtrapolator:
+    """
+    Estimasi box pada frame di antara keyframe dengan ekstrapolasi kecepatan konstan
+    dari centroid track (box pada keyframe terakhir digeser sebesar v * jarak frame).
+    Tanpa ID track (mode deteksi), box keyframe terakhir dipertahankan (hold).
+    """
+
+    def __init__(self):
+        self.last = Detections()
+        self.last_frame = 0
+        self.velocity = np.zeros((0, 2), dtype=np.float32)
+        self.motion = 0.0
+
+    def observe(self, dets, frame_idx, diagonal=1.0):
+        """Simpan hasil keyframe dan hitung kecepatan per track (px/frame)."""
+        velocity = np.zeros((len(dets), 2), dtype=np.float32)
+        if dets.ids is not None and self.last.ids is not None and len(dets) and len(self.last):
+            gap = max(1, frame_idx - self.last_frame)
+            order = np.argsort(self.last.ids)
+            pos = np.searchsorted(self.last.ids[order], dets.ids)
+            pos = np.minimum(pos, len(order) - 1)
+            matched = self.last.ids[order][pos] == dets.ids
+            prev_xyxy = self.last.xyxy[order][pos]
+            shift = (dets.xyxy[:, :2] + dets.xyxy[:, 2:]) / 2 - (prev_xyxy[:, :2] + prev_xyxy[:, 2:]) / 2
+            velocity[matched] = shift[matched] / gap
+
+        speeds = np.linalg.norm(velocity, axis=1)
+        self.motion = float(speeds.mean() / diagonal) if len(speeds) else 0.0
+        self.last = dets
+        self.last_frame = frame_idx
+        self.velocity = velocity
+
+    def predict(self, frame_idx):
+        """Detections perkiraan untuk frame non-keyframe."""
+        if not len(self.last):
+            return self.last
+        dt = frame_idx - self.last_frame
+        offset = np.tile(self.velocity * dt, 2)
+        return Detections(self.last.xyxy + offset, self.last.conf, self.last.cls, self.last.ids, self.last.names)
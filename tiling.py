@@ -0,0 +1,213 @@
+import json
+import math
+import os
+import cv2
+import numpy as np
+from detections import Detections, box_iou, box_ios
+
+class TilingPolicy:
+    """
+    Inferensi hanya pada region of interest (ROI) dan/atau tile 640 yang saling tumpang tindih.
+    - `rois`: daftar box [x1, y1, x2, y2] (0..1 jika `normalized`, selain itu piksel); kosong = seluruh frame
+    - `tile`: pecah ROI yang lebih besar dari `tile_size` menjadi tile dengan `overlap` (fraksi)
+    - `full_view`: ikut jalankan ROI utuh (diperkecil ke imgsz) agar objek besar yang terpotong tile tetap utuh
+    Deteksi dari semua crop digabung dengan NMS lintas tile (`match`: "ios" / "iou", ambang `match_threshold`);
+    dengan "ios", penggabungan IoS hanya untuk box dari window berbeda yang menyentuh sambungan tile
+    (dalam `seam_margin` piksel), pasangan lain memakai NMS IoU biasa (`iou_threshold`).
+    """
+
+    def __init__(self, rois=None, normalized=True, tile=True, tile_size=640, overlap=0.2,
+                 full_view=True, match="ios", match_threshold=0.6, iou_threshold=0.7, seam_margin=4):
+        if match not in ("ios", "iou"):
+            raise ValueError(f"Unknown match metric: {match}")
+        self.rois = [tuple(float(v) for v in roi) for roi in (rois or [])]
+        self.normalized = normalized
+        self.tile = tile
+        self.tile_size = int(tile_size)
+        self.overlap = min(max(float(overlap), 0.0), 0.9)
+        self.full_view = full_view
+        self.match = match
+        self.match_threshold = match_threshold
+        self.iou_threshold = iou_threshold
+        self.seam_margin = seam_margin
+        self._windows = {}
+        self._seams = {}
+
+    def __repr__(self):
+        return (f"TilingPolicy(rois={self.rois}, normalized={self.normalized}, tile={self.tile}, "
+                f"tile_size={self.tile_size}, overlap={self.overlap}, full_view={self.full_view}, "
+                f"match={self.match!r}, match_threshold={self.match_threshold}, iou_threshold={self.iou_threshold}, "
+                f"seam_margin={self.seam_margin})")
+
+    def to_config(self):
+        """Dict JSON (kebalikan load_tiling_config), mis. untuk job di worker process."""
+        return {"rois": [list(roi) for roi in self.rois], "normalized": self.normalized, "tile": self.tile,
+                "tile_size": self.tile_size, "overlap": self.overlap, "full_view": self.full_view,
+                "match": self.match, "match_threshold": self.match_threshold,
+                "iou_threshold": self.iou_threshold, "seam_margin": self.seam_margin}
+
+    def regions(self, width, height):
+        """ROI dalam piksel (dipotong ke batas frame)."""
+        if not self.rois:
+            return [(0, 0, width, height)]
+        sx, sy = (width, height) if self.normalized else (1, 1)
+        out = []
+        for x1, y1, x2, y2 in self.rois:
+            x1, x2 = sorted((int(round(x1 * sx)), int(round(x2 * sx))))
+            y1, y2 = sorted((int(round(y1 * sy)), int(round(y2 * sy))))
+            x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+            if x2 - x1 > 1 and y2 - y1 > 1:
+                out.append((x1, y1, x2, y2))
+        return out
+
+    def _starts(self, length):
+        if length <= self.tile_size:
+            return [0]
+        step = self.tile_size * (1.0 - self.overlap)
+        n = math.ceil((length - self.tile_size) / step) + 1
+        return [int(round(v)) for v in np.linspace(0, length - self.tile_size, n)]
+
+    def windows(self, width, height):
+        """Crop (x1, y1, x2, y2) yang diinferensi untuk satu ukuran frame (di-cache per ukuran)."""
+        key = (width, height)
+        if key not in self._windows:
+            windows, seams = [], []
+            for x1, y1, x2, y2 in self.regions(width, height):
+                rw, rh = x2 - x1, y2 - y1
+                big = rw > self.tile_size or rh > self.tile_size
+                if not (self.tile and big):
+                    windows.append((x1, y1, x2, y2))
+                    seams.append((False, False, False, False))
+                    continue
+                if self.full_view:
+                    windows.append((x1, y1, x2, y2))
+                    seams.append((False, False, False, False))
+                for ty in self._starts(rh):
+                    for tx in self._starts(rw):
+                        tx2, ty2 = min(tx + self.tile_size, rw), min(ty + self.tile_size, rh)
+                        windows.append((x1 + tx, y1 + ty, x1 + tx2, y1 + ty2))
+                        seams.append((tx > 0, ty > 0, tx2 < rw, ty2 < rh))
+            self._windows[key] = windows
+            self._seams[key] = seams
+        return self._windows[key]
+
+    def seams(self, width, height):
+        """Per window: tepi (kiri, atas, kanan, bawah) yang merupakan sambungan tile, bukan batas ROI."""
+        self.windows(width, height)
+        return self._seams[(width, height)]
+
+    def draw(self, img, color=(0, 200, 255)):
+        """Garis tepi ROI (area yang diinferensi) pada frame."""
+        if not self.rois:
+            return img
+        h, w = img.shape[:2]
+        for x1, y1, x2, y2 in self.regions(w, h):
+            cv2.rectangle(img, (x1, y1), (x2 - 1, y2 - 1), color, 2)
+        return img
+
+def load_tiling_config(config):
+    """
+    TilingPolicy dari dict / string JSON / path file JSON, mis.
+    {"rois": [[0, 0.35, 1, 1]], "tile": true, "tile_size": 640, "overlap": 0.2}
+    """
+    if config is None or isinstance(config, TilingPolicy):
+        return config
+    if isinstance(config, str):
+        text = config
+        if os.path.isfile(config):
+            with open(config) as f:
+                text = f.read()
+        try:
+            config = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid tiling config JSON: {e}") from e
+    if not isinstance(config, dict):
+        raise ValueError("Tiling config must be a JSON object")
+    rois = config.get("rois", [])
+    if any(len(roi) != 4 for roi in rois):
+        raise ValueError("Each ROI must be [x1, y1, x2, y2]")
+    allowed = {"normalized", "tile", "tile_size", "overlap", "full_view", "match", "match_threshold",
+               "iou_threshold", "seam_margin"}
+    return TilingPolicy(rois, **{k: v for k, v in config.items() if k in allowed})
+
+def merge_detections(dets, metric="ios", threshold=0.6, windows=None, at_seam=None, iou_threshold=0.7):
+    """
+    NMS lintas tile per kelas. `windows` = indeks window asal tiap box, `at_seam` = box menyentuh
+    sambungan tile. Dengan "ios", box terpotong sambungan yang berada di dalam box dari window lain
+    digabung ke box dengan skor tertinggi (yang diperluas ke gabungan grupnya); pasangan lain, termasuk
+    box dari window yang sama (mis. dua kendaraan berhimpitan), hanya ditekan oleh IoU >= `iou_threshold`.
+    Dengan "iou" (atau tanpa info window) semua pasangan memakai NMS IoU biasa dengan ambang `threshold`.
+    """
+    if len(dets) < 2:
+        return dets
+    order = np.argsort(-dets.conf, kind="stable")
+    xyxy, conf, cls = dets.xyxy[order].copy(), dets.conf[order], dets.cls[order]
+    same_cls = cls[:, None] == cls[None, :]
+    seam_merge = np.zeros((len(xyxy), len(xyxy)), dtype=bool)
+    if metric == "ios" and windows is not None and at_seam is not None:
+        windows, at_seam = np.asarray(windows)[order], np.asarray(at_seam, dtype=bool)[order]
+        cross_seam = (windows[:, None] != windows[None, :]) & (at_seam[:, None] | at_seam[None, :])
+        seam_merge = same_cls & cross_seam & (box_ios(xyxy, xyxy) >= threshold)
+        suppress = seam_merge | (same_cls & (box_iou(xyxy, xyxy) >= iou_threshold))
+    else:
+        suppress = same_cls & (box_iou(xyxy, xyxy) >= threshold)
+
+    suppressed = np.zeros(len(xyxy), dtype=bool)
+    keep = []
+    for i in range(len(xyxy)):
+        if suppressed[i]:
+            continue
+        group = np.flatnonzero(~suppressed & suppress[i])
+        group = group[group > i]
+        suppressed[group] = True
+        grow = group[seam_merge[i, group]]
+        if len(grow):
+            xyxy[i, :2] = np.minimum(xyxy[i, :2], xyxy[grow, :2].min(axis=0))
+            xyxy[i, 2:] = np.maximum(xyxy[i, 2:], xyxy[grow, 2:].max(axis=0))
+        keep.append(i)
+    return Detections(xyxy[keep], conf[keep], cls[keep], names=dets.names)
+
+def tiled_predict(model, frames, policy, confidence, imgsz=None):
+    """
+    Inferensi ROI / tile untuk beberapa frame dalam SATU panggilan `model.predict`.
+    Box dikembalikan ke koordinat frame dan digabung per frame; mengembalikan list Detections.
+    """
+    crops, owners = [], []
+    for i, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        for window, seams in zip(policy.windows(w, h), policy.seams(w, h)):
+            x1, y1, x2, y2 = window
+            crops.append(frame[y1:y2, x1:x2])
+            owners.append((i, window, seams))
+    if not crops:
+        return [Detections() for _ in frames]
+
+    results = model.predict(source=crops, conf=confidence, imgsz=imgsz or policy.tile_size, verbose=False)
+    parts = [[] for _ in frames]
+    names = None
+    margin = policy.seam_margin
+    for k, ((i, window, seams), res) in enumerate(zip(owners, results)):
+        dets = Detections.from_result(res)
+        names = names or dets.names
+        if len(dets):
+            x1, y1, x2, y2 = window
+            dets.xyxy += np.array([x1, y1, x1, y1], dtype=np.float32)
+            b = dets.xyxy
+            # Box yang menempel di sambungan tile kemungkinan terpotong dan perlu digabung lintas window
+            at_seam = ((seams[0] & (b[:, 0] <= x1 + margin)) | (seams[1] & (b[:, 1] <= y1 + margin))
+                       | (seams[2] & (b[:, 2] >= x2 - margin)) | (seams[3] & (b[:, 3] >= y2 - margin)))
+            parts[i].append((dets, np.full(len(dets), k), at_seam))
+
+    merged = []
+    for chunks in parts:
+        if not chunks:
+            merged.append(Detections(names=names))
+            continue
+        dets = Detections(np.concatenate([d.xyxy for d, _, _ in chunks]),
+                          np.concatenate([d.conf for d, _, _ in chunks]),
+                          np.concatenate([d.cls for d, _, _ in chunks]), names=names)
+        merged.append(merge_detections(dets, policy.match, policy.match_threshold,
+                                       windows=np.concatenate([w for _, w, _ in chunks]),
+                                       at_seam=np.concatenate([s for _, _, s in chunks]),
+                                       iou_threshold=policy.iou_threshold))
+    return merged
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+import numpy as np
+from detections import Detections
+
+# Parameter ByteTrack (sama dengan default ultralytics/cfg/trackers/bytetrack.yaml)
+BYTETRACK_ARGS = {
+    "tracker_type": "bytetrack",
+    "track_high_thresh": 0.25,
+    "track_low_thresh": 0.1,
+    "new_track_thresh": 0.25,
+    "track_buffer": 30,
+    "match_thresh": 0.8,
+    "fuse_score": True,
+}
+
+class _TrackerInput:
+    """Adaptor Detections -> antarmuka yang dibaca BYTETracker.update (conf, cls, xywh, indexing)."""
+
+    def __init__(self, conf, cls, xywh):
+        self.conf, self.cls, self.xywh = conf, cls, xywh
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, idx):
+        return _TrackerInput(self.conf[idx], self.cls[idx], self.xywh[idx])
+
+def make_tracker(frame_rate=30):
+    """
+    BYTETracker mandiri (di luar model.track), untuk deteksi yang tidak berasal dari satu
+    panggilan predict per frame: batch lintas stream, tiling, dsb.
+    """
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    return BYTETracker(args=SimpleNamespace(**BYTETRACK_ARGS), frame_rate=int(round(frame_rate)) or 30)
+
+def update_tracker(tracker, dets, img=None):
+    """Update tracker dengan Detections satu frame; mengembalikan Detections ber-ID (hanya track aktif)."""
+    xyxy = dets.xyxy
+    xywh = np.concatenate([(xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+    tracks = tracker.update(_TrackerInput(dets.conf, dets.cls.astype(np.float32), xywh), img)
+    if not len(tracks):
+        return Detections(ids=np.empty(0), names=dets.names)
+    # Baris track: x1, y1, x2, y2, id, score, cls, idx
+    return Detections(tracks[:, :4], tracks[:, 5], tracks[:, 6], tracks[:, 4], dets.names)
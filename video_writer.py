@@ -0,0 +1,215 @@
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from functools import lru_cache
+import cv2
+
+# Codec yang bisa dipilih: nama -> encoder ffmpeg (None = cv2.VideoWriter mp4v, perilaku lama)
+CODECS = {
+    "auto": None,  # libx264 via ffmpeg bila ada, selain itu mp4v
+    "h264": "libx264",
+    "h264_nvenc": "h264_nvenc",
+    "h264_qsv": "h264_qsv",
+    "h264_vaapi": "h264_vaapi",
+    "h264_videotoolbox": "h264_videotoolbox",
+    "hevc": "libx265",
+    "mp4v": None,
+}
+
+class EncodePolicy:
+    """
+    Kebijakan encode video output.
+    - `codec`: kunci CODECS; selain "mp4v" frame mentah di-pipe ke proses ffmpeg lokal (H.264 yuv420p,
+      faststart, bisa diputar di browser). Tanpa ffmpeg / encoder gagal start -> cv2.VideoWriter mp4v
+    - `max_width`: perkecil output ke lebar ini (None = resolusi sumber)
+    - `every`: tulis hanya setiap frame ke-k (FPS output ikut dibagi k)
+    - `crf` / `preset`: kualitas & kecepatan encoder software (libx264 / libx265)
+    - `queue_size`: buffer frame antara pipeline dan thread encoder (penuh = pipeline menunggu)
+    """
+
+    def __init__(self, codec="auto", max_width=None, every=1, crf=23, preset="veryfast", queue_size=32):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}' (use {', '.join(CODECS)})")
+        self.codec = codec
+        self.max_width = int(max_width) if max_width else None
+        self.every = max(1, int(every))
+        self.crf = crf
+        self.preset = preset
+        self.queue_size = max(1, int(queue_size))
+
+    def output_size(self, width, height):
+        """Ukuran output (genap, syarat yuv420p) setelah downscale."""
+        if self.max_width and width > self.max_width:
+            height = height * self.max_width / width
+            width = self.max_width
+        return max(2, int(width) // 2 * 2), max(2, int(round(height)) // 2 * 2)
+
+@lru_cache(maxsize=1)
+def ffmpeg_path():
+    return shutil.which("ffmpeg")
+
+@lru_cache(maxsize=1)
+def ffmpeg_encoders():
+    """Encoder video yang dikompilasi di ffmpeg lokal (kosong jika ffmpeg tidak ada)."""
+    if ffmpeg_path() is None:
+        return frozenset()
+    try:
+        out = subprocess.run([ffmpeg_path(), "-hide_banner", "-encoders"], capture_output=True, text=True,
+                             timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return frozenset()
+    return frozenset(line.split()[1] for line in out.splitlines() if line.startswith(" V") and len(line.split()) > 1)
+
+def available_codecs():
+    """Pilihan codec yang bisa dipakai di mesin ini (untuk UI / CLI)."""
+    encoders = ffmpeg_encoders()
+    return [name for name, encoder in CODECS.items() if encoder is None or encoder in encoders]
+
+def _resolve_encoder(codec):
+    if codec == "auto":
+        return "libx264" if "libx264" in ffmpeg_encoders() else None
+    encoder = CODECS[codec]
+    return encoder if encoder in ffmpeg_encoders() else None
+
+class _FfmpegEncoder:
+    """Proses ffmpeg yang menerima frame BGR mentah lewat stdin."""
+
+    def __init__(self, path, fps, size, encoder, policy):
+        width, height = size
+        cmd = [ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps:.3f}", "-i", "-",
+               "-an", "-c:v", encoder, "-pix_fmt", "yuv420p", "-movflags", "+faststart"]
+        if encoder in ("libx264", "libx265"):
+            cmd += ["-preset", policy.preset, "-crf", str(policy.crf)]
+        self.proc = subprocess.Popen(cmd + [path], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        self.proc.stdin.write(frame.tobytes())
+
+    def release(self):
+        self.proc.stdin.close()
+        err = self.proc.stderr.read().decode(errors="replace").strip()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with {self.proc.returncode}: {err[-500:]}")
+
+class _Cv2Encoder:
+    def __init__(self, path, fps, size):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+
+# Penanda akhir stream untuk thread encoder
+_END = object()
+
+class AsyncVideoWriter:
+    """
+    Pengganti cv2.VideoWriter (`write` / `release`) yang meng-encode di thread sendiri.
+    `write` hanya memasukkan frame ke queue berbatas, sehingga stage encode di pipeline tidak lagi
+    menunggu encoder. Decimation (EncodePolicy.every) dilakukan sebelum frame masuk queue, downscale
+    di thread encoder. Bila ffmpeg gagal pada frame pertama, writer beralih ke mp4v.
+    Dengan `profiler`, waktu resize + encode per frame di thread encoder dicatat sebagai stage "encode".
+    """
+
+    def __init__(self, path, fps, size, policy=None, profiler=None):
+        self.path = path
+        self.policy = policy or EncodePolicy()
+        self.profiler = profiler
+        self.source_size = tuple(int(v) for v in size)
+        self.size = self.policy.output_size(*self.source_size)
+        self.fps = (fps or 20.0) / self.policy.every
+        self.encoder_name = _resolve_encoder(self.policy.codec) if self.policy.codec != "mp4v" else None
+        self.backend = f"ffmpeg:{self.encoder_name}" if self.encoder_name else "cv2:mp4v"
+        self._queue = queue.Queue(maxsize=self.policy.queue_size)
+        self._error = None
+        self._n_in = 0
+        self._n_written = 0
+        self._encode_seconds = 0.0
+        self._released = False
+        self._thread = threading.Thread(target=self._worker, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        if self.encoder_name is not None:
+            try:
+                return _FfmpegEncoder(self.path, self.fps, self.size, self.encoder_name, self.policy)
+            except OSError:
+                pass
+        self.backend = "cv2:mp4v"
+        return _Cv2Encoder(self.path, self.fps, self.size)
+
+    def _prepare(self, frame):
+        if frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _worker(self):
+        encoder = None
+        try:
+            encoder = self._open()
+            while True:
+                frame = self._queue.get()
+                if frame is _END:
+                    break
+                t0 = time.perf_counter()
+                frame = self._prepare(frame)
+                try:
+                    encoder.write(frame)
+                except (BrokenPipeError, OSError):
+                    if self._n_written or isinstance(encoder, _Cv2Encoder):
+                        raise
+                    # Encoder ffmpeg tidak bisa start (mis. encoder hardware tanpa GPU): pakai mp4v
+                    encoder.proc.kill()
+                    encoder.proc.wait()
+                    self.backend = "cv2:mp4v"
+                    encoder = _Cv2Encoder(self.path, self.fps, self.size)
+                    encoder.write(frame)
+                self._n_written += 1
+                t1 = time.perf_counter()
+                self._encode_seconds += t1 - t0
+                if self.profiler is not None:
+                    self.profiler.record("encode", t0, t1)
+        except Exception as e:
+            self._error = e
+            # Kosongkan queue agar `write` yang sedang menunggu tidak macet
+            while self._queue.get() is not _END:
+                pass
+        finally:
+            if encoder is not None:
+                try:
+                    encoder.release()
+                except Exception as e:
+                    self._error = self._error or e
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        self._n_in += 1
+        if (self._n_in - 1) % self.policy.every:
+            return
+        self._queue.put(frame)
+
+    def release(self):
+        """Tunggu semua frame di buffer ter-encode lalu tutup file."""
+        if self._released:
+            return
+        self._released = True
+        self._queue.put(_END)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "size": self.size,
+            "fps": self.fps,
+            "frames_in": self._n_in,
+            "frames_written": self._n_written,
+            "encode_ms": 1000.0 * self._encode_seconds / self._n_written if self._n_written else 0.0,
+        }
@@ -0,0 +1,251 @@
+import json
+import cv2
+import numpy as np
+from line_counter import TrackTable, CountResult, build_class_table, lookup_classes, box_centroids
+
+# Konfigurasi default: satu garis horizontal di tengah frame (koordinat ternormalisasi 0..1)
+DEFAULT_ZONE_CONFIG = {
+    "normalized": True,
+    "lines": [{"name": "Line", "points": [[0.0, 0.5], [1.0, 0.5]]}],
+    "zones": [],
+}
+
+# --- 1. GEOMETRI ---
+class CountingLine:
+    """
+    Garis hitung virtual (segmen p1 -> p2, sudut bebas).
+    Sisi kanan arah p1 -> p2 (dalam koordinat gambar) dianggap 'in'; untuk garis horizontal
+    kiri -> kanan artinya bergerak turun melewati garis = 'in', naik = 'out'.
+    """
+
+    def __init__(self, name, p1, p2):
+        self.name = name
+        self.p1 = np.asarray(p1, dtype=np.float32)
+        self.p2 = np.asarray(p2, dtype=np.float32)
+
+    def scaled(self, sx, sy):
+        s = np.array([sx, sy], dtype=np.float32)
+        return CountingLine(self.name, self.p1 * s, self.p2 * s)
+
+class PolygonZone:
+    """Zona poligon untuk hitung masuk/keluar dan okupansi."""
+
+    def __init__(self, name, points):
+        self.name = name
+        self.points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        if len(self.points) < 3:
+            raise ValueError(f"Zone '{name}' needs at least 3 points")
+
+    def scaled(self, sx, sy):
+        return PolygonZone(self.name, self.points * np.array([sx, sy], dtype=np.float32))
+
+def _cross(ax, ay, bx, by):
+    return ax * by - ay * bx
+
+def segment_crossings(prev, cur, p1, p2):
+    """
+    Uji lintasan segmen (prev -> cur) terhadap L garis secara vektor.
+    prev, cur: (N, 2); p1, p2: (L, 2). Mengembalikan (crossed_in, crossed_out) berbentuk (N, L).
+    """
+    prev = prev[:, None, :]
+    cur = cur[:, None, :]
+    d = (p2 - p1)[None, :, :]
+    p1 = p1[None, :, :]
+
+    # Sisi titik terhadap garis (tanda cross product)
+    s_prev = _cross(d[..., 0], d[..., 1], prev[..., 0] - p1[..., 0], prev[..., 1] - p1[..., 1])
+    s_cur = _cross(d[..., 0], d[..., 1], cur[..., 0] - p1[..., 0], cur[..., 1] - p1[..., 1])
+
+    # Titik potong harus berada di dalam rentang segmen garis
+    m = cur - prev
+    t1 = _cross(m[..., 0], m[..., 1], p1[..., 0] - prev[..., 0], p1[..., 1] - prev[..., 1])
+    t2 = _cross(m[..., 0], m[..., 1], p1[..., 0] + d[..., 0] - prev[..., 0], p1[..., 1] + d[..., 1] - prev[..., 1])
+    within = (t1 * t2) <= 0
+
+    crossed_in = within & (s_prev < 0) & (s_cur >= 0)
+    crossed_out = within & (s_prev > 0) & (s_cur <= 0)
+    return crossed_in, crossed_out
+
+def points_in_polygon(points, polygon):
+    """Ray casting vektor: (N, 2) titik terhadap satu poligon (E, 2) -> mask (N,)."""
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    xa, ya = polygon[:, 0][None, :], polygon[:, 1][None, :]
+    xb, yb = np.roll(polygon[:, 0], -1)[None, :], np.roll(polygon[:, 1], -1)[None, :]
+    straddle = (ya > y) != (yb > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_hit = xa + (y - ya) * (xb - xa) / (yb - ya)
+    hits = straddle & (x < x_hit)
+    return (np.count_nonzero(hits, axis=1) % 2) == 1
+
+# --- 2. KONFIGURASI ---
+def load_zone_config(source):
+    """
+    Baca konfigurasi garis/zona dari dict, string JSON, atau path file JSON.
+    Format: {"normalized": true, "lines": [{"name", "points": [[x, y], [x, y]]}],
+             "zones": [{"name", "points": [[x, y], ...]}]}
+    """
+    if isinstance(source, dict):
+        cfg = source
+    else:
+        text = source
+        if not text.lstrip().startswith("{"):
+            with open(source) as f:
+                text = f.read()
+        try:
+            cfg = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid zone config JSON: {e}") from e
+
+    lines = []
+    for i, item in enumerate(cfg.get("lines", [])):
+        points = item.get("points", [])
+        if len(points) != 2:
+            raise ValueError(f"Line #{i + 1} needs exactly 2 points")
+        lines.append(CountingLine(item.get("name", f"L{i + 1}"), points[0], points[1]))
+
+    zones = [PolygonZone(item.get("name", f"Z{i + 1}"), item.get("points", []))
+             for i, item in enumerate(cfg.get("zones", []))]
+
+    if not lines and not zones:
+        raise ValueError("Zone config must define at least one line or zone")
+    return {"normalized": bool(cfg.get("normalized", False)), "lines": lines, "zones": zones}
+
+# --- 3. ENGINE PENGHITUNG ---
+class ZoneCounter:
+    """
+    Penghitung multi-garis & multi-zona berbasis array per frame.
+    - Garis: setiap track dihitung sekali per garis (per kelas), arah 'in' / 'out'
+    - Zona: event masuk/keluar per track dan okupansi (jumlah track di dalam zona) per frame
+    Geometri di-resolve ke piksel sekali pada frame pertama (`resolve`).
+    """
+
+    def __init__(self, names, class_mapping, labels=None, config=None, evict_after=90):
+        config = load_zone_config(config if config is not None else DEFAULT_ZONE_CONFIG)
+        self._config = config
+        self.lines = config["lines"]
+        self.zones = config["zones"]
+
+        self.labels = list(labels) if labels else []
+        for name in class_mapping.values():
+            if name not in self.labels:
+                self.labels.append(name)
+        self.class_table = build_class_table(names, class_mapping, self.labels)
+
+        n_lines, n_zones = len(self.lines), len(self.zones)
+        self.line_totals = np.zeros((n_lines, len(self.labels), 2), dtype=np.int64)
+        self.zone_totals = np.zeros((n_zones, 2), dtype=np.int64)
+        self.occupancy = np.zeros(n_zones, dtype=np.int64)
+        self.tracks = TrackTable(n_flags=n_lines + n_zones, evict_after=evict_after)
+        self._size = None
+
+    def resolve(self, width, height):
+        """Konversi koordinat ternormalisasi ke piksel dan siapkan array geometri (sekali saja)."""
+        if self._size == (width, height):
+            return
+        sx, sy = (width, height) if self._config["normalized"] else (1, 1)
+        self.lines = [line.scaled(sx, sy) for line in self._config["lines"]]
+        self.zones = [zone.scaled(sx, sy) for zone in self._config["zones"]]
+        self._p1 = np.array([line.p1 for line in self.lines], dtype=np.float32).reshape(-1, 2)
+        self._p2 = np.array([line.p2 for line in self.lines], dtype=np.float32).reshape(-1, 2)
+        self._size = (width, height)
+
+    @property
+    def counts(self):
+        """Total per kelas (dijumlah untuk semua garis): {label: {'in': n, 'out': n}}."""
+        totals = self.line_totals.sum(axis=0)
+        return {name: {'in': int(totals[i, 0]), 'out': int(totals[i, 1])}
+                for i, name in enumerate(self.labels)}
+
+    @property
+    def line_counts(self):
+        return {line.name: {'in': int(self.line_totals[i, :, 0].sum()), 'out': int(self.line_totals[i, :, 1].sum())}
+                for i, line in enumerate(self.lines)}
+
+    @property
+    def zone_counts(self):
+        return {zone.name: {'in': int(self.zone_totals[i, 0]), 'out': int(self.zone_totals[i, 1]),
+                            'occupancy': int(self.occupancy[i])}
+                for i, zone in enumerate(self.zones)}
+
+    def update(self, ids, xyxy, classes, frame_idx):
+        """
+        Update satu frame. Mengembalikan CountResult dengan tambahan
+        `line_in` / `line_out` (N, L) untuk garis yang dilintasi dan
+        `zone_in` / `zone_out` (N, Z) untuk zona yang dimasuki / ditinggalkan pada frame ini.
+        """
+        if self._size is None:
+            raise RuntimeError("ZoneCounter.resolve(width, height) must be called before update()")
+        n_lines = len(self.lines)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        centroids = box_centroids(xyxy)
+        label_idx = lookup_classes(self.class_table, classes)
+        valid = label_idx >= 0
+        rows_valid = np.flatnonzero(valid)
+
+        line_in = np.zeros((len(ids), n_lines), dtype=bool)
+        line_out = np.zeros((len(ids), n_lines), dtype=bool)
+        zone_in = np.zeros((len(ids), len(self.zones)), dtype=bool)
+        zone_out = np.zeros((len(ids), len(self.zones)), dtype=bool)
+
+        v_ids, v_pos, v_lbl = ids[valid], centroids[valid].astype(np.float32), label_idx[valid]
+        idx, found = self.tracks.match(v_ids)
+
+        # Garis: uji lintasan dari posisi sebelumnya ke posisi sekarang
+        if n_lines and found.any():
+            f_rows = np.flatnonzero(found)
+            t_rows = idx[found]
+            c_in, c_out = segment_crossings(self.tracks.pos[t_rows], v_pos[found], self._p1, self._p2)
+            fresh = ~self.tracks.flags[t_rows, :n_lines]
+            c_in &= fresh
+            c_out &= fresh & ~c_in
+
+            for j in range(n_lines):
+                np.add.at(self.line_totals[j, :, 0], v_lbl[f_rows[c_in[:, j]]], 1)
+                np.add.at(self.line_totals[j, :, 1], v_lbl[f_rows[c_out[:, j]]], 1)
+            self.tracks.flags[t_rows, :n_lines] |= c_in | c_out
+
+            line_in[rows_valid[f_rows]] = c_in
+            line_out[rows_valid[f_rows]] = c_out
+
+        # Zona: status di dalam/luar sekarang vs frame sebelumnya
+        inside = np.zeros((len(v_ids), len(self.zones)), dtype=bool)
+        for k, zone in enumerate(self.zones):
+            inside[:, k] = points_in_polygon(v_pos, zone.points)
+        if len(self.zones):
+            self.occupancy[:] = inside.sum(axis=0)
+            if found.any():
+                was_inside = self.tracks.flags[idx[found], n_lines:]
+                now_inside = inside[found]
+                entered, left = ~was_inside & now_inside, was_inside & ~now_inside
+                self.zone_totals[:, 0] += entered.sum(axis=0)
+                self.zone_totals[:, 1] += left.sum(axis=0)
+                zone_in[rows_valid[found]] = entered
+                zone_out[rows_valid[found]] = left
+
+        self.tracks.commit(v_ids, v_pos, frame_idx, idx, found)
+        if len(self.zones) and len(v_ids):
+            rows, ok = self.tracks.match(v_ids)
+            self.tracks.flags[rows[ok], n_lines:] = inside[ok]
+
+        return CountResult(centroids, valid, line_in.any(axis=1), line_out.any(axis=1), line_in, line_out,
+                           zone_in, zone_out)
+
+    def draw(self, img, result=None):
+        """Gambar garis (berkedip hijau/kuning saat dilintasi) dan poligon zona."""
+        for k, zone in enumerate(self.zones):
+            pts = zone.points.astype(np.int32).reshape(-1, 1, 2)
+            cv2.polylines(img, [pts], True, (255, 0, 255), 2)
+            x, y = pts[0, 0]
+            cv2.putText(img, f"{zone.name}: {int(self.occupancy[k])}", (int(x) + 5, int(y) - 8),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
+
+        for j, line in enumerate(self.lines):
+            p1 = tuple(int(v) for v in line.p1)
+            p2 = tuple(int(v) for v in line.p2)
+            if result is not None and result.line_in[:, j].any():
+                cv2.line(img, p1, p2, (0, 255, 0), 5)
+            elif result is not None and result.line_out[:, j].any():
+                cv2.line(img, p1, p2, (255, 255, 0), 5)
+            cv2.line(img, p1, p2, (0, 0, 255), 2)
+        return img